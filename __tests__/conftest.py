@@ -1,17 +1,29 @@
+import os
 import pytest
+
+# Run against the in-memory backend unless MONGO_BACKEND=motor is set
+os.environ.setdefault("MONGO_BACKEND", "memory")
+
 from fastapi.testclient import TestClient
 from main import create_app
-from motor.motor_asyncio import AsyncIOMotorClient
 
+from utils.db import create_client
 from utils.settings import MONGO_TEST_DB_NAME,MONGO_URI
 from utils import jwt_handler
 from routes import auth_routes
 
+# Every xdist worker gets its own database, so workers never share state
+TEST_DB_NAME = f"{MONGO_TEST_DB_NAME}_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}"
+
+
+@pytest.fixture
+def test_db_name():
+    return TEST_DB_NAME
 
 @pytest.fixture
 async def test_mongo_connection():
-    client = AsyncIOMotorClient(MONGO_URI)
-    db = client[MONGO_TEST_DB_NAME]
+    client = create_client(MONGO_URI)
+    db = client[TEST_DB_NAME]
     # Check if 'users' collection exists
     if 'users' not in await db.list_collection_names():
         # Optionally create it or handle the scenario
@@ -22,7 +34,7 @@ async def test_mongo_connection():
 
 @pytest.fixture
 async def get_user_id(test_user_data,test_mongo_connection):
-    user = await test_mongo_connection.users_collection.find_one({"email": test_user_data["email"]})
+    user = await test_mongo_connection["users"].find_one({"email": test_user_data["email"]})
     assert user, f"User with email {test_user_data['email']} not found in database"
     return str(user["_id"])
 
@@ -33,7 +45,7 @@ def reset_limiter():
 
 @pytest.fixture(scope="module")
 def test_client():
-    app = create_app(db_name=MONGO_TEST_DB_NAME)
+    app = create_app(db_name=TEST_DB_NAME)
     with TestClient(app) as client:
         yield client
 
@@ -0,0 +1,9 @@
+import pytest
+from routes import auth_routes
+
+
+@pytest.fixture(autouse=True)
+def leave_limiter_clean():
+    # Later modules count on the per-route limits starting from zero
+    yield
+    auth_routes.limiter.reset()
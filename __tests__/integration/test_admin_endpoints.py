@@ -0,0 +1,70 @@
+import pytest
+from fastapi import status
+from utils.activity_tracker import activity_tracker
+from utils.settings import MONGO_BACKEND
+
+
+@pytest.fixture
+def admin_auth(test_client, test_admin_data, test_user_data, reset_limiter):
+    test_client.post("/auth/signup", json=test_admin_data)
+    test_client.post("/auth/signup", json=test_user_data)
+    response = test_client.post("/auth/login", json={
+        "email": test_admin_data["email"],
+        "password": test_admin_data["password"]
+    })
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.mark.asyncio
+async def test_search_users_by_prefix(test_client, admin_auth):
+    response = test_client.get("/auth/users/search", params={"q": "TEST", "role": "user", "debug": True}, headers=admin_auth)
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [user["email"] for user in data["users"]] == ["test@example.com"]
+    assert "query_plan" in data
+    # The in-memory backend only fakes plans; the index check needs a real server
+    if MONGO_BACKEND == "motor":
+        assert data["query_plan"]["collection_scan"] is False
+
+@pytest.mark.asyncio
+async def test_user_stats(test_client, admin_auth):
+    response = test_client.get("/auth/users/stats", headers=admin_auth)
+
+    assert response.status_code == status.HTTP_200_OK
+    stats = response.json()["stats"]
+    assert stats["total_users"] == 2
+    assert stats["users_per_role"] == {"admin": 1, "user": 1}
+    assert sum(day["count"] for day in stats["signups_per_day"]) == 2
+
+@pytest.mark.asyncio
+async def test_profile_conditional_get(test_client, admin_auth):
+    first = test_client.get("/auth/profile", headers=admin_auth)
+    etag = first.headers["ETag"]
+
+    cached = test_client.get("/auth/profile", headers={**admin_auth, "If-None-Match": etag})
+
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+
+@pytest.mark.asyncio
+async def test_users_etag_survives_activity_flush(test_client, admin_auth):
+    # Flush the admin's login first; after that, polling only refreshes
+    # last_seen_at within the same window and must keep returning 304
+    test_client.portal.call(activity_tracker.flush)
+    etag = test_client.get("/auth/users", headers=admin_auth).headers["ETag"]
+
+    for _ in range(2):
+        test_client.portal.call(activity_tracker.flush)
+        response = test_client.get("/auth/users", headers={**admin_auth, "If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+@pytest.mark.asyncio
+async def test_users_etag_changes_after_signup(test_client, admin_auth, test_user_data2):
+    etag = test_client.get("/auth/users", headers=admin_auth).headers["ETag"]
+    assert test_client.get("/auth/users", headers={**admin_auth, "If-None-Match": etag}).status_code == 304
+
+    test_client.post("/auth/signup", json=test_user_data2)
+    response = test_client.get("/auth/users", headers={**admin_auth, "If-None-Match": etag})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
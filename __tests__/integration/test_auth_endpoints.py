@@ -72,6 +72,7 @@ async def test_profile_success(test_client, auth_headers):
     assert data["success"] is True
     assert "user" in data
     assert "email" in data["user"]
+    assert "version" not in data["user"]
 
 @pytest.mark.asyncio
 async def test_admin_only_non_admin(test_client,create_admin, auth_headers):
@@ -0,0 +1,28 @@
+import pytest
+from fastapi import status
+
+
+@pytest.mark.asyncio
+async def test_oversized_body_rejected_before_parsing(test_client):
+    response = test_client.post("/auth/login", json={"email": "a@example.com", "password": "x" * 5000})
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert response.json()["success"] is False
+
+@pytest.mark.asyncio
+async def test_oversized_chunked_body_rejected(test_client):
+    def chunks():
+        yield b'{"email": "a@example.com", "password": "'
+        for _ in range(10):
+            yield b"x" * 1000
+        yield b'"}'
+
+    response = test_client.post("/auth/login", content=chunks(), headers={"Content-Type": "application/json"})
+
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+@pytest.mark.asyncio
+async def test_login_password_length_limited(test_client, reset_limiter):
+    response = test_client.post("/auth/login", json={"email": "a@example.com", "password": "x" * 101})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,15 @@
+import pytest
+from fastapi import status
+
+
+@pytest.mark.asyncio
+async def test_signup_retry_with_idempotency_key_replays(test_client, reset_limiter):
+    body = {"full_name": "Retry User", "email": "retry@example.com", "password": "retrypassword"}
+    headers = {"Idempotency-Key": "signup-retry-1"}
+
+    first = test_client.post("/auth/signup", json=body, headers=headers)
+    retry = test_client.post("/auth/signup", json=body, headers=headers)
+
+    assert first.status_code == retry.status_code == status.HTTP_200_OK
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
@@ -0,0 +1,43 @@
+import os
+import pytest
+from bson import ObjectId
+from pymongo import ReadPreference
+from utils.db import MongoDBConnection
+from utils.settings import MONGO_TEST_DB_NAME
+
+# Start a local single-host replica set to run these, e.g.
+#   mongod --replSet rs0 --dbpath /tmp/rs0 && mongosh --eval "rs.initiate()"
+#   MONGO_REPLICA_SET_URI="mongodb://localhost:27017/?replicaSet=rs0" pytest
+REPLICA_SET_URI = os.environ.get("MONGO_REPLICA_SET_URI")
+
+pytestmark = pytest.mark.skipif(not REPLICA_SET_URI, reason="MONGO_REPLICA_SET_URI not set")
+
+
+@pytest.fixture
+async def replica_set_connection():
+    # Explicit backend: the test conftest defaults MONGO_BACKEND to "memory"
+    connection = MongoDBConnection(backend="motor")
+    assert await connection.connect(MONGO_TEST_DB_NAME, uri=REPLICA_SET_URI)
+    yield connection
+    await connection.users_collection.delete_many({})
+    await connection.close()
+
+@pytest.mark.asyncio
+async def test_reporting_reads_prefer_secondaries(replica_set_connection):
+    assert replica_set_connection.users_collection.read_preference == ReadPreference.PRIMARY
+    assert replica_set_connection.users_reporting_collection.read_preference == ReadPreference.SECONDARY_PREFERRED
+
+@pytest.mark.asyncio
+async def test_causal_session_reads_own_write(replica_set_connection):
+    user_id = ObjectId()
+    await replica_set_connection.users_collection.insert_one({"_id": user_id, "full_name": "Before"})
+
+    async with await replica_set_connection.start_causal_session() as session:
+        await replica_set_connection.causal(replica_set_connection.users_collection).update_one(
+            {"_id": user_id}, {"$set": {"full_name": "After"}}, session=session
+        )
+        user = await replica_set_connection.causal(replica_set_connection.users_reporting_collection).find_one(
+            {"_id": user_id}, session=session
+        )
+
+    assert user["full_name"] == "After"
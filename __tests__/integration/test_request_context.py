@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_request_id_is_echoed_or_generated(test_client):
+    echoed = test_client.get("/auth/profile", headers={"X-Request-ID": "client-id-1"})
+    generated = test_client.get("/auth/profile")
+
+    assert echoed.headers["X-Request-ID"] == "client-id-1"
+    assert len(generated.headers["X-Request-ID"]) == 32
@@ -0,0 +1,12 @@
+import pytest
+from utils.db import mongo_connection
+
+
+# Controller tests patch methods on the live collection handles, so they
+# need a connected (by default in-memory) database.
+@pytest.fixture(autouse=True)
+async def connected_mongo(test_db_name):
+    await mongo_connection.connect(test_db_name)
+    yield
+    await mongo_connection.client.drop_database(test_db_name)
+    await mongo_connection.close()
@@ -0,0 +1,71 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+from bson import ObjectId
+from utils.activity_tracker import ActivityTracker
+from utils.db import mongo_connection
+
+USER_ID = "507f1f77bcf86cd799439011"
+
+
+def test_record_keeps_latest_timestamp_per_user():
+    tracker = ActivityTracker(flush_interval=60)
+    earlier = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    later = earlier + timedelta(minutes=5)
+
+    tracker.record_login(USER_ID, at=earlier)
+    tracker.record_seen(USER_ID, at=later)
+    tracker.record_seen(USER_ID, at=earlier)
+
+    assert tracker.pending_count() == 1
+    assert tracker._pending[USER_ID] == {"last_login_at": earlier, "last_seen_at": later}
+
+@pytest.mark.asyncio
+async def test_flush_issues_single_bulk_write(mocker):
+    collection = mocker.patch.object(mongo_connection, "users_collection")
+    collection.bulk_write = AsyncMock(return_value=MagicMock(modified_count=2))
+    bump_version = mocker.patch.object(mongo_connection, "bump_collection_version", new_callable=AsyncMock)
+    tracker = ActivityTracker(flush_interval=60)
+    tracker.record_seen(USER_ID)
+    tracker.record_seen("507f1f77bcf86cd799439012")
+
+    flushed = await tracker.flush()
+
+    assert flushed == 2
+    assert tracker.pending_count() == 0
+    operations = collection.bulk_write.await_args.args[0]
+    assert len(operations) == 2
+    assert operations[0]._filter == {"_id": ObjectId(USER_ID)}
+    assert "$max" in operations[0]._doc
+    bump_version.assert_awaited_once_with("users")
+
+def test_record_seen_is_coarsened():
+    tracker = ActivityTracker(flush_interval=60, last_seen_resolution=300)
+
+    tracker.record_seen(USER_ID, at=datetime(2025, 1, 1, 0, 7, 42, tzinfo=timezone.utc))
+
+    assert tracker._pending[USER_ID] == {"last_seen_at": datetime(2025, 1, 1, 0, 5, tzinfo=timezone.utc)}
+
+@pytest.mark.asyncio
+async def test_flush_without_changes_keeps_version(mocker):
+    collection = mocker.patch.object(mongo_connection, "users_collection")
+    collection.bulk_write = AsyncMock(return_value=MagicMock(modified_count=0))
+    bump_version = mocker.patch.object(mongo_connection, "bump_collection_version", new_callable=AsyncMock)
+    tracker = ActivityTracker(flush_interval=60)
+    tracker.record_seen(USER_ID)
+
+    await tracker.flush()
+
+    bump_version.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_flush_failure_requeues_pending(mocker):
+    collection = mocker.patch.object(mongo_connection, "users_collection")
+    collection.bulk_write = AsyncMock(side_effect=RuntimeError("down"))
+    tracker = ActivityTracker(flush_interval=60)
+    tracker.record_login(USER_ID)
+
+    with pytest.raises(RuntimeError):
+        await tracker.flush()
+
+    assert tracker.pending_count() == 1
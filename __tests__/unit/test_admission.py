@@ -0,0 +1,46 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from utils.admission import AdmissionController
+
+
+@pytest.mark.asyncio
+async def test_sheds_when_queue_is_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1)
+
+    async with controller.slot():
+        with pytest.raises(HTTPException) as exc_info:
+            async with controller.slot():
+                pass
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers["Retry-After"] == "1"
+    assert controller.stats()["shed_queue_full"] == 1
+    assert controller.stats()["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_sheds_after_queue_deadline():
+    controller = AdmissionController(max_concurrency=1, max_queue=5, queue_timeout=0.01)
+
+    async with controller.slot():
+        with pytest.raises(HTTPException):
+            async with controller.slot():
+                pass
+
+    assert controller.stats()["shed_timeout"] == 1
+    assert controller.stats()["queued"] == 0
+
+@pytest.mark.asyncio
+async def test_queued_request_runs_when_slot_frees():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=1)
+    order = []
+
+    async def job(name):
+        async with controller.slot():
+            order.append(name)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(job("first"), job("second"))
+
+    assert order == ["first", "second"]
+    assert controller.stats()["admitted_total"] == 2
@@ -7,7 +7,8 @@ from controllers.auth_controller import (
     get_current_user,
     update_user_profile,
     change_user_password,
-    list_all_users
+    list_all_users,
+    search_users
 )
 from schemas.auth_schema import (
     SignupReqBody,
@@ -16,6 +17,7 @@ from schemas.auth_schema import (
     ChangePasswordReq
 )
 from unittest.mock import AsyncMock
+from utils.db import mongo_connection
 
 @pytest.mark.asyncio
 async def test_create_user_success(mocker):
@@ -161,3 +163,49 @@ async def test_get_current_user_missing_token():
     assert exc_info.value.status_code == status.HTTP_401_UNAUTHORIZED
     assert exc_info.value.detail == "Authorization token missing"
 
+
+@pytest.mark.asyncio
+async def test_search_users_uses_anchored_prefix(mocker):
+    collection = mocker.patch.object(mongo_connection, "users_reporting_collection")
+    collection.find.return_value.limit.return_value.to_list = AsyncMock(return_value=[{
+        "_id": ObjectId("507f1f77bcf86cd799439011"),
+        "full_name": "Test User",
+        "email": "test@example.com",
+        "role": "user"
+    }])
+    collection.find.return_value.limit.return_value.explain = AsyncMock(return_value={
+        "queryPlanner": {"winningPlan": {
+            "stage": "LIMIT",
+            "inputStage": {"stage": "SUBPLAN", "inputStage": {"stage": "OR", "inputStages": [
+                {"stage": "IXSCAN", "indexName": "email_lower_role"},
+                {"stage": "IXSCAN", "indexName": "full_name_lower_role"}
+            ]}}
+        }}
+    })
+
+    result = await search_users({"role": "admin"}, "Te.", ["user"], limit=5, debug=True)
+
+    query = collection.find.call_args.args[0]
+    assert query["$or"][0] == {"email_lower": {"$regex": "^te\\."}}
+    assert query["role"] == {"$in": ["user"]}
+    collection.find.return_value.limit.assert_called_with(5)
+    assert result["count"] == 1
+    assert result["query_plan"]["collection_scan"] is False
+    assert result["query_plan"]["indexes"] == ["email_lower_role", "full_name_lower_role"]
+
+@pytest.mark.asyncio
+async def test_search_users_requires_admin():
+    with pytest.raises(HTTPException) as exc_info:
+        await search_users({"role": "user"}, "te")
+
+    assert exc_info.value.status_code == status.HTTP_403_FORBIDDEN
+
+@pytest.mark.asyncio
+async def test_search_users_rejects_blank_query(mocker):
+    collection = mocker.patch.object(mongo_connection, "users_reporting_collection")
+
+    with pytest.raises(HTTPException) as exc_info:
+        await search_users({"role": "admin"}, "   ")
+
+    assert exc_info.value.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    collection.find.assert_not_called()
@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError, ServerSelectionTimeoutError
+from controllers import auth_controller
+from utils.db import MongoDBConnection
+from utils.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def failing_operation():
+    return AsyncMock(side_effect=ServerSelectionTimeoutError("no servers"))
+
+@pytest.mark.asyncio
+async def test_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    operation = failing_operation()
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            await breaker.call(operation)
+        assert exc_info.value.status_code == 503
+
+    assert breaker.state == OPEN
+    with pytest.raises(HTTPException) as exc_info:
+        await breaker.call(operation)
+    assert operation.await_count == 2  # rejected without touching the database
+    assert "Retry-After" in exc_info.value.headers
+
+@pytest.mark.asyncio
+async def test_half_open_probe_closes_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    with pytest.raises(HTTPException):
+        await breaker.call(failing_operation())
+
+    assert await breaker.call(AsyncMock(return_value="ok")) == "ok"
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    with pytest.raises(HTTPException):
+        await breaker.call(failing_operation())
+
+    with pytest.raises(asyncio.CancelledError):
+        await breaker.call(AsyncMock(side_effect=asyncio.CancelledError()))
+    assert breaker.state == HALF_OPEN
+
+    assert await breaker.call(AsyncMock(return_value="ok")) == "ok"
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_application_errors_do_not_trip_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+
+    with pytest.raises(DuplicateKeyError):
+        await breaker.call(AsyncMock(side_effect=DuplicateKeyError("dup", 11000)))
+
+    assert breaker.state == CLOSED
+
+@pytest.mark.asyncio
+async def test_get_current_user_serves_cached_principal_when_open(mocker):
+    principal = {"_id": "507f1f77bcf86cd799439011", "email": "test@example.com", "full_name": "Test User", "role": "user", "version": 1}
+    mocker.patch.object(auth_controller, "MONGO_BREAKER_SERVE_CACHED_PRINCIPALS", True)
+    mocker.patch("controllers.auth_controller.jwt_handler.verify_token", return_value={"sub": principal["_id"]})
+    mocker.patch.object(auth_controller.mongo_breaker, "call", side_effect=HTTPException(status_code=503, detail="down"))
+    auth_controller.principal_cache.put(principal["_id"], principal)
+    token = type('MockToken', (), {'credentials': 'dummy_token'})
+
+    try:
+        assert await auth_controller.get_current_user(token) == principal
+    finally:
+        auth_controller.principal_cache.clear()
+
+@pytest.mark.asyncio
+async def test_unreachable_database_at_startup_opens_breaker(mocker):
+    mocker.patch("utils.db.MONGO_SERVER_SELECTION_TIMEOUT_MS", 100)
+    connection = MongoDBConnection(backend="motor")
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+
+    assert await connection.connect("unreachable_db", uri="mongodb://127.0.0.1:1") is False
+    with pytest.raises(HTTPException) as exc_info:
+        await breaker.call(lambda: connection.users_collection.find_one({}))
+
+    assert exc_info.value.status_code == 503
+    assert breaker.state == OPEN
+    await connection.close()
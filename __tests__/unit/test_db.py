@@ -0,0 +1,22 @@
+import pytest
+from pymongo import ReadPreference
+from utils.db import MongoDBConnection, create_client, read_preference_from_name
+
+
+def test_read_preference_from_name():
+    assert read_preference_from_name("secondaryPreferred") == ReadPreference.SECONDARY_PREFERRED
+    assert read_preference_from_name("primary") == ReadPreference.PRIMARY
+
+def test_read_preference_from_name_unknown():
+    with pytest.raises(ValueError):
+        read_preference_from_name("secondary_preferred")
+
+@pytest.mark.asyncio
+async def test_causal_collections_use_majority_concerns():
+    # Motor connects lazily, so no server is needed to inspect the options
+    client = create_client("mongodb://localhost:1", backend="motor")
+    collection = MongoDBConnection(backend="motor").causal(client["db"]["users"])
+
+    assert collection.read_concern.level == "majority"
+    assert collection.write_concern.document == {"w": "majority"}
+    client.close()
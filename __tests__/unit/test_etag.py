@@ -0,0 +1,23 @@
+from utils.etag import make_weak_etag, etag_matches, not_modified
+
+
+def test_make_weak_etag():
+    assert make_weak_etag("user", "abc", 3) == 'W/"user-abc-3"'
+
+def test_etag_matches_weak_comparison():
+    etag = make_weak_etag("user", "abc", 3)
+    assert etag_matches('W/"user-abc-3"', etag)
+    assert etag_matches('"user-abc-3"', etag)
+    assert etag_matches('W/"other", W/"user-abc-3"', etag)
+    assert etag_matches("*", etag)
+
+def test_etag_does_not_match():
+    etag = make_weak_etag("user", "abc", 3)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('W/"user-abc-2"', etag)
+
+def test_not_modified_has_no_body():
+    response = not_modified('W/"x"')
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["ETag"] == 'W/"x"'
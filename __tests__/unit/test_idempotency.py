@@ -0,0 +1,101 @@
+import asyncio
+import hashlib
+import pytest
+from fastapi import HTTPException
+from utils.admission import AdmissionController
+from utils.db import mongo_connection
+from utils.idempotency import IdempotencyStore
+
+
+def make_store():
+    return IdempotencyStore(ttl_seconds=60, lock_seconds=30, wait_seconds=1, cache_size=16)
+
+class CountingHandler:
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.result = result or {"success": True}
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return self.result
+
+@pytest.mark.asyncio
+async def test_retry_replays_stored_response():
+    store = make_store()
+    handler = CountingHandler()
+
+    first = await store.run("key-1", "signup:1.2.3.4", "{}", handler)
+    store.clear_cache()  # force the replay to come from the collection
+    replay = await store.run("key-1", "signup:1.2.3.4", "{}", handler)
+
+    assert first == {"success": True}
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert handler.calls == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_run_handler_once():
+    store = make_store()
+    handler = CountingHandler()
+
+    results = await asyncio.gather(*[store.run("key-2", "scope", "{}", handler) for _ in range(3)])
+
+    assert handler.calls == 1
+    assert results[0] == {"success": True}
+    assert all(r.status_code == 200 for r in results[1:])
+
+@pytest.mark.asyncio
+async def test_waiting_duplicates_do_not_hold_admission_slots():
+    store = make_store()
+    admission = AdmissionController(max_concurrency=1, max_queue=0, queue_timeout=1)
+    handler = CountingHandler()
+
+    results = await asyncio.gather(*[
+        store.run("key-7", "scope", "{}", lambda: admission.run(handler)) for _ in range(5)
+    ])
+
+    assert handler.calls == 1
+    assert len(results) == 5
+    assert admission.stats()["shed_queue_full"] == 0
+    assert admission.stats()["admitted_total"] == 1
+
+@pytest.mark.asyncio
+async def test_client_errors_replay_and_server_errors_release_key():
+    store = make_store()
+    rejected = CountingHandler(error=HTTPException(status_code=400, detail="Email already registered"))
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            await store.run("key-3", "scope", "{}", rejected)
+        assert exc_info.value.status_code == 400
+    assert rejected.calls == 1
+
+    failing = CountingHandler(error=HTTPException(status_code=503, detail="down"))
+    with pytest.raises(HTTPException):
+        await store.run("key-4", "scope", "{}", failing)
+    assert await store.run("key-4", "scope", "{}", CountingHandler()) == {"success": True}
+
+@pytest.mark.asyncio
+async def test_key_reused_with_different_request():
+    store = make_store()
+    await store.run("key-5", "scope", '{"a": 1}', CountingHandler())
+
+    with pytest.raises(HTTPException) as exc_info:
+        await store.run("key-5", "scope", '{"a": 2}', CountingHandler())
+
+    assert exc_info.value.status_code == 422
+
+@pytest.mark.asyncio
+async def test_stored_fingerprint_is_not_a_plain_hash_of_the_body():
+    store = make_store()
+    body = '{"email":"test@example.com","password":"testpassword"}'
+    await store.run("key-6", "scope", body, CountingHandler())
+
+    doc = await mongo_connection.idempotency_collection.find_one({})
+
+    plain = hashlib.sha256(body.encode("utf-8")).hexdigest()
+    assert doc["fingerprint"] != plain
+    assert doc["response"]["fingerprint"] != plain
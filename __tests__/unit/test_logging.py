@@ -0,0 +1,75 @@
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueListener
+from utils.logging_config import JsonFormatter, RequestIdFilter, StructuredQueueHandler
+from utils.request_context import add_timing, request_id_var, request_timings_var, timed
+
+
+def make_record(**extra):
+    record = logging.makeLogRecord({"name": "auth.test", "levelno": logging.INFO, "levelname": "INFO", "msg": "hello %s", "args": ("world",)})
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+def test_json_formatter_includes_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record(total_ms=1.5, path="/auth/login")))
+
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["total_ms"] == 1.5
+    assert entry["path"] == "/auth/login"
+
+def test_request_id_filter_tags_records_from_context():
+    token = request_id_var.set("abc123")
+    try:
+        record = make_record()
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    assert record.request_id == "abc123"
+
+def test_timings_accumulate_per_request():
+    token = request_timings_var.set({})
+    try:
+        add_timing("mongo_ms", 2.0)
+        add_timing("mongo_ms", 3.0)
+        with timed("bcrypt_ms"):
+            pass
+        timings = request_timings_var.get()
+    finally:
+        request_timings_var.reset(token)
+
+    assert timings["mongo_ms"] == 5.0
+    assert timings["bcrypt_ms"] >= 0
+
+def test_timings_ignored_outside_a_request():
+    add_timing("mongo_ms", 1.0)
+
+    assert request_timings_var.get() is None
+
+def test_exception_traceback_survives_the_queue():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(log_queue, output)
+    handler = StructuredQueueHandler(log_queue)
+    logger = logging.getLogger("auth.test.queue")
+    logger.propagate = False
+    logger.addHandler(handler)
+    listener.start()
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("failed %s", "here")
+    finally:
+        logger.removeHandler(handler)
+        listener.stop()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "failed here"
+    assert "ValueError: boom" in entry["exception"]
@@ -0,0 +1,76 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from utils.memory_db import InMemoryClient
+
+
+@pytest.fixture
+async def collection():
+    client = InMemoryClient()
+    yield client["memory_db_test"]["items"]
+    await client.drop_database("memory_db_test")
+
+@pytest.mark.asyncio
+async def test_insert_and_find_with_operators(collection):
+    await collection.insert_one({"name": "alice", "age": 30, "role": "admin"})
+    await collection.insert_one({"name": "bob", "age": 20, "role": "user"})
+
+    assert (await collection.find_one({"age": {"$gt": 25}}))["name"] == "alice"
+    assert (await collection.find_one({"name": {"$regex": "^b"}}, {"name": 1, "_id": 0})) == {"name": "bob"}
+    names = [d["name"] async for d in collection.find({"$or": [{"role": "user"}, {"age": 30}]}).sort("age", -1)]
+    assert names == ["alice", "bob"]
+    assert await collection.find_one({"missing": {"$exists": True}}) is None
+
+@pytest.mark.asyncio
+async def test_unique_index_rejects_duplicates(collection):
+    await collection.create_index("email", unique=True)
+    await collection.insert_one({"email": "a@example.com"})
+
+    with pytest.raises(DuplicateKeyError):
+        await collection.insert_one({"email": "a@example.com"})
+    other = await collection.insert_one({"email": "b@example.com"})
+    with pytest.raises(DuplicateKeyError):
+        await collection.update_one({"_id": other.inserted_id}, {"$set": {"email": "a@example.com"}})
+
+@pytest.mark.asyncio
+async def test_update_operators_and_upsert(collection):
+    result = await collection.update_one(
+        {"_id": "users"}, {"$inc": {"version": 1}, "$setOnInsert": {"epoch": "e1"}}, upsert=True
+    )
+    assert result.upserted_id == "users"
+    await collection.update_one({"_id": "users"}, {"$inc": {"version": 1}, "$setOnInsert": {"epoch": "e2"}}, upsert=True)
+    assert await collection.find_one({"_id": "users"}) == {"_id": "users", "version": 2, "epoch": "e1"}
+
+    now = datetime.now(timezone.utc)
+    await collection.bulk_write([UpdateOne({"_id": "users"}, {"$max": {"seen": now}})])
+    result = await collection.update_one({"_id": "users"}, {"$max": {"seen": now - timedelta(days=1)}})
+    assert result.matched_count == 1 and result.modified_count == 0
+
+@pytest.mark.asyncio
+async def test_aggregate_group_and_sort(collection):
+    for role in ["user", "admin", "user"]:
+        await collection.insert_one({"role": role})
+
+    rows = [row async for row in collection.aggregate([
+        {"$group": {"_id": "$role", "count": {"$sum": 1}}},
+        {"$sort": {"_id": 1}}
+    ])]
+    assert rows == [{"_id": "admin", "count": 1}, {"_id": "user", "count": 2}]
+
+@pytest.mark.asyncio
+async def test_ttl_index_expires_documents(collection):
+    await collection.create_index("created_at", expireAfterSeconds=60)
+    await collection.insert_one({"created_at": datetime.now(timezone.utc) - timedelta(minutes=5)})
+    await collection.insert_one({"created_at": datetime.now(timezone.utc)})
+
+    assert await collection.count_documents({}) == 1
+
+@pytest.mark.asyncio
+async def test_unsupported_operators_fail_loudly(collection):
+    await collection.insert_one({"name": "alice"})
+
+    with pytest.raises(OperationFailure):
+        await collection.find_one({"name": {"$nin": ["bob"]}})
+    with pytest.raises(OperationFailure):
+        await collection.update_one({"name": "alice"}, {"$unset": {"name": ""}})
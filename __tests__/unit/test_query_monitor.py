@@ -0,0 +1,48 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from utils.memory_db import InMemoryClient
+from utils.query_monitor import SlowQueryMonitor
+
+
+def started(request_id, command_name="find", command=None):
+    return SimpleNamespace(
+        command_name=command_name,
+        command=command or {command_name: "users", "filter": {"email": "a@example.com"}, "lsid": {}, "$db": "monitor_test"},
+        database_name="monitor_test",
+        connection_id=("localhost", 27017),
+        request_id=request_id,
+    )
+
+def finished(request_id, duration_ms):
+    return SimpleNamespace(connection_id=("localhost", 27017), request_id=request_id, duration_micros=int(duration_ms * 1000))
+
+def test_top_commands_ranked_by_total_time():
+    monitor = SlowQueryMonitor(threshold_ms=100, explain_sample_rate=0)
+    monitor.started(started(1))
+    monitor.succeeded(finished(1, 5))
+    monitor.started(started(2, "insert", {"insert": "users", "documents": []}))
+    monitor.succeeded(finished(2, 20))
+    monitor.started(started(3, "ping", {"ping": 1}))
+    monitor.succeeded(finished(3, 500))
+
+    top = monitor.top_commands()
+
+    assert [row["command"] for row in top] == ["insert", "find"]
+    assert top[0]["collection"] == "users"
+    assert monitor.summary()["recent_slow"] == []
+
+@pytest.mark.asyncio
+async def test_slow_command_logged_and_explained():
+    client = InMemoryClient()
+    monitor = SlowQueryMonitor(threshold_ms=10, explain_sample_rate=1)
+    monitor.attach(client)
+
+    monitor.started(started(1))
+    monitor.succeeded(finished(1, 50))
+    await asyncio.sleep(0.01)
+
+    slow = monitor.summary()["recent_slow"]
+    assert slow[0]["command"] == "find"
+    assert slow[0]["duration_ms"] == 50
+    assert slow[0]["plan"]["collection_scan"] is True
@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from utils.stats_cache import RefreshingCache
+
+
+class CountingLoader:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.calls
+
+@pytest.mark.asyncio
+async def test_first_load_is_shared_by_concurrent_callers():
+    loader = CountingLoader()
+    cache = RefreshingCache(loader, ttl=60)
+
+    results = await asyncio.gather(cache.get(), cache.get(), cache.get())
+
+    assert results == [1, 1, 1]
+    assert loader.calls == 1
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_refreshing_in_background():
+    loader = CountingLoader()
+    cache = RefreshingCache(loader, ttl=0)
+    assert await cache.get() == 1
+
+    # Stale: the old value comes back immediately and a refresh is scheduled
+    assert await cache.get() == 1
+    await cache._task
+
+    assert loader.calls == 2
+    assert cache._value == 2
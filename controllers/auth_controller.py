@@ -1,26 +1,48 @@
 from fastapi import HTTPException,status,Depends,Request
 from utils.db import mongo_connection
+from utils.activity_tracker import activity_tracker
 from schemas.auth_schema import SignupReqBody,LoginReqBody,ChangePasswordReq,UpdateProfileReq
 from utils import bcrypt_handler,jwt_handler
 from fastapi.security import HTTPBearer
+from fastapi.concurrency import run_in_threadpool
 from bson import ObjectId
+from typing import List,Optional
+from datetime import datetime,timedelta,timezone
+from utils.stats_cache import RefreshingCache
+from utils.circuit_breaker import mongo_breaker
+from utils.ttl_cache import TTLCache
+from utils.query_monitor import summarize_plan
+from utils.settings import (
+    USER_STATS_CACHE_TTL_SECONDS,USER_STATS_SIGNUP_DAYS,MONGO_REPORTING_TIMEOUT_MS,
+    MONGO_BREAKER_SERVE_CACHED_PRINCIPALS,PRINCIPAL_CACHE_TTL_SECONDS,PRINCIPAL_CACHE_MAX_SIZE
+)
+import re
 auth_scheme = HTTPBearer(scheme_name="Bearer", auto_error=False)
 
+# Fallback for get_current_user while the Mongo circuit is open (opt-in)
+principal_cache = TTLCache(max_size=PRINCIPAL_CACHE_MAX_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
 async def create_user(user: SignupReqBody):
-    existing_user = await mongo_connection.users_collection.find_one({"email": user.email})
+    existing_user = await mongo_breaker.call(
+        lambda: mongo_connection.users_collection.find_one({"email": user.email})
+    )
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = bcrypt_handler.hash_password(user.password)
+    hashed_pw = await run_in_threadpool(bcrypt_handler.hash_password, user.password)
 
     user_dict = {
         "full_name": user.full_name,
         "email": user.email,
         "password": hashed_pw,
-        "role": user.role
+        "role": user.role,
+        "full_name_lower": user.full_name.lower(),
+        "email_lower": user.email.lower(),
+        "version": 1
     }
 
-    result = await mongo_connection.users_collection.insert_one(user_dict)
+    result = await mongo_breaker.call(lambda: mongo_connection.users_collection.insert_one(user_dict))
+    await mongo_breaker.call(lambda: mongo_connection.bump_collection_version("users"))
 
     return {
         "success":True,
@@ -35,14 +57,17 @@ async def create_user(user: SignupReqBody):
 
 
 async def login_handler(data:LoginReqBody):
-    user = await mongo_connection.users_collection.find_one({"email": data.email})
+    user = await mongo_breaker.call(
+        lambda: mongo_connection.users_collection.find_one({"email": data.email})
+    )
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
-    if not bcrypt_handler.verify_password(data.password, user['password']):
+    if not await run_in_threadpool(bcrypt_handler.verify_password, data.password, user['password']):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     
     token = jwt_handler.create_token(user_id=str(user["_id"]))
+    activity_tracker.record_login(str(user["_id"]))
     
     return {
             "success":True,
@@ -67,16 +92,36 @@ async def get_current_user(token=Depends(auth_scheme)):
                 detail="Invalid token: missing user ID",
             )
         
-    user =  await mongo_connection.users_collection.find_one({"_id": ObjectId(user_id)})
+    try:
+        user = await mongo_breaker.call(
+            lambda: mongo_connection.users_collection.find_one({"_id": ObjectId(user_id)})
+        )
+    except HTTPException as exc:
+        cached = principal_cache.get(user_id) if MONGO_BREAKER_SERVE_CACHED_PRINCIPALS else None
+        if exc.status_code != status.HTTP_503_SERVICE_UNAVAILABLE or cached is None:
+            raise
+        return cached
+
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     
-    return {
+    activity_tracker.record_seen(user_id)
+
+    principal = {
                 "_id":str(user["_id"]),
                 "email": user["email"],
                 "full_name": user["full_name"],
-                "role": user["role"]
+                "role": user["role"],
+                "version": user.get("version", 0)
             }
+    if MONGO_BREAKER_SERVE_CACHED_PRINCIPALS:
+        principal_cache.put(user_id, principal)
+    return principal
+
+
+def public_user(principal: dict):
+    # "version" only feeds the profile ETag and is not part of the API
+    return {k: v for k, v in principal.items() if k != "version"}
 
 
 async def update_user_profile(
@@ -98,20 +143,32 @@ async def update_user_profile(
             detail="No fields to update"
         )
 
-    result = await mongo_connection.users_collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$set": update_values}
-    )
+    # Keep the lowercased search fields in step with the originals
+    if "full_name" in update_values:
+        update_values["full_name_lower"] = update_values["full_name"].lower()
+    if "email" in update_values:
+        update_values["email_lower"] = update_values["email"].lower()
 
-    if result.modified_count == 0:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found or no changes made"
-        )
+    async with await mongo_connection.start_causal_session() as session:
+        # Only match when a field actually changes, so a no-op update neither
+        # bumps the version nor counts as modified
+        result = await mongo_breaker.call(lambda: mongo_connection.causal(mongo_connection.users_collection).update_one(
+            {"_id": ObjectId(user_id), "$or": [{k: {"$ne": v}} for k, v in update_values.items()]},
+            {"$set": update_values, "$inc": {"version": 1}},
+            session=session
+        ))
 
-    updated_user = await mongo_connection.users_collection.find_one(
-        {"_id": ObjectId(user_id)}
-    )
+        if result.modified_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found or no changes made"
+            )
+        await mongo_breaker.call(lambda: mongo_connection.bump_collection_version("users", session=session))
+
+        updated_user = await mongo_breaker.call(lambda: mongo_connection.causal(mongo_connection.users_reporting_collection).find_one(
+            {"_id": ObjectId(user_id)},
+            session=session
+        ))
     return {
         "success": True,
         "message": "Profile updated successfully",
@@ -134,8 +191,8 @@ async def change_user_password(
             detail="Can only change your own password"
         )
 
-    user = await mongo_connection.users_collection.find_one(
-        {"_id": ObjectId(user_id)}
+    user = await mongo_breaker.call(
+        lambda: mongo_connection.users_collection.find_one({"_id": ObjectId(user_id)})
     )
     
     if not user:
@@ -144,8 +201,9 @@ async def change_user_password(
             detail="User not found"
         )
 
-    if not bcrypt_handler.verify_password(
-        passwords.current_password, 
+    if not await run_in_threadpool(
+        bcrypt_handler.verify_password,
+        passwords.current_password,
         user["password"]
     ):
         raise HTTPException(
@@ -153,36 +211,150 @@ async def change_user_password(
             detail="Current password is incorrect"
         )
 
-    new_hashed_pw = bcrypt_handler.hash_password(passwords.new_password)
+    new_hashed_pw = await run_in_threadpool(bcrypt_handler.hash_password, passwords.new_password)
     
-    await mongo_connection.users_collection.update_one(
+    await mongo_breaker.call(lambda: mongo_connection.users_collection.update_one(
         {"_id": ObjectId(user_id)},
-        {"$set": {"password": new_hashed_pw}}
-    )
+        {"$set": {"password": new_hashed_pw}, "$inc": {"version": 1}}
+    ))
 
     return {
         "success": True,
         "message": "Password changed successfully"
     }
 
-async def list_all_users(current_user: dict):
+async def list_all_users(current_user: dict, session=None):
     if current_user.get("role") != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required"
         )
 
+    collection = mongo_connection.users_reporting_collection
+    if session is not None:
+        collection = mongo_connection.causal(collection)
+
     users = []
-    async for user in mongo_connection.users_collection.find():
+    for user in await mongo_breaker.call(
+        lambda: collection.find(session=session).to_list(None),
+        timeout_ms=MONGO_REPORTING_TIMEOUT_MS
+    ):
         users.append({
             "id": str(user["_id"]),
             "full_name": user["full_name"],
             "email": user["email"],
-            "role": user["role"]
+            "role": user["role"],
+            "last_login_at": user.get("last_login_at"),
+            "last_seen_at": user.get("last_seen_at")
         })
 
     return {
         "success": True,
         "count": len(users),
         "users": users
-    }
\ No newline at end of file
+    }
+
+
+async def search_users(
+    current_user: dict,
+    q: str,
+    roles: Optional[List[str]] = None,
+    limit: int = 20,
+    debug: bool = False
+):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    term = q.strip().lower()
+    if not term:
+        # A bare "^" would match every user and walk the whole index
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Search query must not be blank"
+        )
+
+    # Anchored, case-sensitive regexes on the lowercased fields become index
+    # range scans; each $or branch is served by its own index.
+    prefix = {"$regex": "^" + re.escape(term)}
+    query = {"$or": [{"email_lower": prefix}, {"full_name_lower": prefix}]}
+    if roles:
+        query["role"] = {"$in": roles}
+    projection = {"full_name": 1, "email": 1, "role": 1}
+
+    users = []
+    for user in await mongo_breaker.call(
+        lambda: mongo_connection.users_reporting_collection.find(query, projection).limit(limit).to_list(None),
+        timeout_ms=MONGO_REPORTING_TIMEOUT_MS
+    ):
+        users.append({
+            "id": str(user["_id"]),
+            "full_name": user["full_name"],
+            "email": user["email"],
+            "role": user["role"]
+        })
+
+    response = {
+        "success": True,
+        "count": len(users),
+        "users": users
+    }
+    if debug:
+        plan = await mongo_breaker.call(
+            lambda: mongo_connection.users_reporting_collection.find(query, projection).limit(limit).explain(),
+            timeout_ms=MONGO_REPORTING_TIMEOUT_MS
+        )
+        response["query_plan"] = summarize_plan(plan)
+    return response
+
+
+async def compute_user_stats():
+    users_collection = mongo_connection.users_reporting_collection
+
+    def reporting_call(operation):
+        return mongo_breaker.call(operation, timeout_ms=MONGO_REPORTING_TIMEOUT_MS)
+
+    total_users = await reporting_call(lambda: users_collection.estimated_document_count())
+
+    users_per_role = {}
+    for row in await reporting_call(lambda: users_collection.aggregate([
+        {"$group": {"_id": "$role", "count": {"$sum": 1}}}
+    ]).to_list(None)):
+        users_per_role[row["_id"]] = row["count"]
+
+    # Signup time comes from the ObjectId, so the window is an _id range
+    # served by the default index.
+    since = datetime.now(timezone.utc) - timedelta(days=USER_STATS_SIGNUP_DAYS)
+    signups_per_day = []
+    for row in await reporting_call(lambda: users_collection.aggregate([
+        {"$match": {"_id": {"$gte": ObjectId.from_datetime(since)}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": {"$toDate": "$_id"}}},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id": 1}}
+    ]).to_list(None)):
+        signups_per_day.append({"date": row["_id"], "count": row["count"]})
+
+    return {
+        "total_users": total_users,
+        "users_per_role": users_per_role,
+        "signups_per_day": signups_per_day,
+        "generated_at": datetime.now(timezone.utc)
+    }
+
+user_stats_cache = RefreshingCache(compute_user_stats, ttl=USER_STATS_CACHE_TTL_SECONDS)
+
+async def get_user_stats(current_user: dict):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+
+    return {
+        "success": True,
+        "stats": await user_stats_cache.get()
+    }
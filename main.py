@@ -3,11 +3,15 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from typing import Optional
 from utils.db import mongo_connection
-from utils.settings import MONGO_TEST_DB_NAME,MONGO_DB_NAME
+from utils.activity_tracker import activity_tracker
+from utils.settings import MONGO_TEST_DB_NAME,MONGO_DB_NAME,MAX_REQUEST_BODY_BYTES,MAX_AUTH_BODY_BYTES
 from contextlib import asynccontextmanager
 from routes import auth_routes
 from slowapi.errors import RateLimitExceeded
 from utils import exception_handlers
+from utils.logging_config import setup_logging
+from utils.request_context import RequestContextMiddleware
+from utils.body_limit import BodySizeLimitMiddleware
 
 
 
@@ -16,21 +20,24 @@ from utils import exception_handlers
 async def lifespan(app: FastAPI, db_name):
 
     await mongo_connection.connect(db_name)
+    activity_tracker.start()
     yield
     
-    # Cleanup only if it's the test DB
-    if db_name == MONGO_TEST_DB_NAME:
-        await mongo_connection.db["users"].delete_many({})
+    await activity_tracker.stop()
+
+    # Cleanup only if it's a test DB (one per xdist worker)
+    if db_name.startswith(MONGO_TEST_DB_NAME) and mongo_connection.client:
+        await mongo_connection.client.drop_database(db_name)
         
     await mongo_connection.close()
 
 
 # ----------------- Error Formatter ----------------- #
-def format_error_response(message: str, errors: Optional[list] = None, status_code: int = 400):
+def format_error_response(message: str, errors: Optional[list] = None, status_code: int = 400, headers: Optional[dict] = None):
     content = {"success": False, "message": message}
     if errors:
         content["errors"] = errors
-    return JSONResponse(status_code=status_code, content=content)
+    return JSONResponse(status_code=status_code, content=content, headers=headers)
 
 
 # ----------------- Register Handlers ----------------- #
@@ -44,6 +51,7 @@ def register_exception_handlers(app: FastAPI):
 
 # ----------------- App Factory ----------------- #
 def create_app(db_name: str = MONGO_DB_NAME) -> FastAPI:
+    setup_logging()
     app = FastAPI(
         title="FastAPI Auth with MongoDB",
         version="1.0.0",
@@ -52,6 +60,16 @@ def create_app(db_name: str = MONGO_DB_NAME) -> FastAPI:
     )
 
     app.include_router(auth_routes.router)
+    app.add_middleware(
+        BodySizeLimitMiddleware,
+        default_limit=MAX_REQUEST_BODY_BYTES,
+        route_limits=[
+            (r"^/auth/(signup|login)$", MAX_AUTH_BODY_BYTES),
+            (r"^/auth/users/[^/]+/(profile|change-password)$", MAX_AUTH_BODY_BYTES),
+        ]
+    )
+    # Added last so it is outermost and also tags rejected requests
+    app.add_middleware(RequestContextMiddleware)
     register_exception_handlers(app)
 
     return app
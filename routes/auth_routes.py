@@ -1,6 +1,13 @@
-from fastapi import APIRouter,Depends,Request,HTTPException,Path
-from schemas.auth_schema import SignupReqBody,LoginReqBody,UpdateProfileReq,ChangePasswordReq
-from controllers.auth_controller import create_user,login_handler,get_current_user,update_user_profile,change_user_password,list_all_users
+from fastapi import APIRouter,Depends,Request,Response,HTTPException,Path,Query,Header
+from typing import List,Optional
+from schemas.auth_schema import SignupReqBody,LoginReqBody,UpdateProfileReq,ChangePasswordReq,UserRole
+from controllers.auth_controller import create_user,login_handler,get_current_user,update_user_profile,change_user_password,list_all_users,search_users,get_user_stats,public_user
+from utils.db import mongo_connection
+from utils.etag import make_weak_etag,etag_matches,not_modified
+from utils.admission import admit_cpu_heavy,cpu_admission
+from utils.circuit_breaker import mongo_breaker
+from utils.query_monitor import query_monitor
+from utils.idempotency import idempotency_store
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -9,21 +16,40 @@ limiter = Limiter(key_func=get_remote_address)
 
 @router.post("/signup")
 @limiter.limit("5/minute")
-async def signup(request:Request,user: SignupReqBody):
-    return await create_user(user)
+async def signup(
+    request:Request,
+    user: SignupReqBody,
+    idempotency_key: Optional[str] = Header(default=None)
+):
+    return await idempotency_store.run(
+        idempotency_key,
+        scope=f"signup:{get_remote_address(request)}",
+        fingerprint=user.model_dump_json(),
+        # Waiting duplicates and replays must not hold a bcrypt slot
+        handler=lambda: cpu_admission.run(lambda: create_user(user))
+    )
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(admit_cpu_heavy)])
 @limiter.limit("5/minute")
 async def login(request:Request,user: LoginReqBody):
     return await login_handler(user)
 
 @router.get("/profile") 
 @limiter.limit("5/minute")
-async def profile(request: Request,current_user = Depends(get_current_user)):
+async def profile(
+    request: Request,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    current_user = Depends(get_current_user)
+):
+    etag = make_weak_etag("user", current_user["_id"], current_user["version"])
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
     return {
         "success": True,
         "message": "User profile fetched successfully",
-        "user": current_user
+        "user": public_user(current_user)
     }
 
 
@@ -35,7 +61,7 @@ async def admin_only(request: Request, current_user=Depends(get_current_user)):
     return {
         "success": True,
         "message": "Access granted: Admins only",
-        "user": current_user
+        "user": public_user(current_user)
     }
 
 
@@ -55,16 +81,89 @@ async def change_password(
     request: Request,
     user_id: str,
     data: ChangePasswordReq,
+    idempotency_key: Optional[str] = Header(default=None),
     current_user: dict = Depends(get_current_user)
 ):
-    return await change_user_password(user_id, data, current_user)
+    return await idempotency_store.run(
+        idempotency_key,
+        scope=f"change-password:{current_user['_id']}",
+        fingerprint=f"{user_id}:{data.model_dump_json()}",
+        handler=lambda: cpu_admission.run(lambda: change_user_password(user_id, data, current_user))
+    )
 
 @router.get("/users")
 @limiter.limit("5/minute")
 async def list_users(
     request: Request,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
     current_user: dict = Depends(get_current_user)
 ):
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Access denied. Admins only")
-    return await list_all_users(current_user)
\ No newline at end of file
+    # The version is read first in the same causal session, so the listing
+    # (possibly from a secondary) is never older than the ETag it is sent with
+    async with await mongo_connection.start_causal_session() as session:
+        version = await mongo_breaker.call(
+            lambda: mongo_connection.get_collection_version("users", session=session)
+        )
+        etag = make_weak_etag("users", version)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        response.headers["ETag"] = etag
+        return await list_all_users(current_user, session=session)
+
+@router.get("/users/search")
+@limiter.limit("5/minute")
+async def search(
+    request: Request,
+    q: str = Query(min_length=1, max_length=100, description="Email or full name prefix"),
+    role: Optional[List[UserRole]] = Query(default=None),
+    limit: int = Query(default=20, ge=1, le=100),
+    debug: bool = Query(default=False, description="Include the query plan"),
+    current_user: dict = Depends(get_current_user)
+):
+    roles = [r.value for r in role] if role else None
+    return await search_users(current_user, q, roles, limit, debug)
+
+@router.get("/users/stats")
+@limiter.limit("5/minute")
+async def user_stats(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    return await get_user_stats(current_user)
+
+@router.get("/metrics/admission")
+@limiter.limit("5/minute")
+async def admission_metrics(request: Request, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied. Admins only")
+    return {
+        "success": True,
+        "admission": cpu_admission.stats()
+    }
+
+@router.get("/metrics/mongo")
+@limiter.limit("5/minute")
+async def mongo_metrics(request: Request, current_user: dict = Depends(get_current_user)):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied. Admins only")
+    return {
+        "success": True,
+        "circuit_breaker": mongo_breaker.stats()
+    }
+
+@router.get("/metrics/slow-queries")
+@limiter.limit("5/minute")
+async def slow_query_metrics(
+    request: Request,
+    limit: int = Query(default=10, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Access denied. Admins only")
+    return {
+        "success": True,
+        "slow_queries": query_monitor.summary(limit)
+    }
@@ -41,13 +41,13 @@ class SignupReqBody(BaseModel):
         return v 
     
 class LoginReqBody(BaseModel):
-    email:str
-    password:str
+    email: str = Field(max_length=254)
+    password: str = Field(max_length=100)
     
 class UpdateProfileReq(BaseModel):
     full_name: Optional[str] = None
     email: Optional[EmailStr] = None
 
 class ChangePasswordReq(BaseModel):
-    current_password: str
-    new_password: str
\ No newline at end of file
+    current_password: str = Field(max_length=100)
+    new_password: str = Field(max_length=100)
\ No newline at end of file
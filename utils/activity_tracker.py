@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from utils.db import mongo_connection
+from utils.settings import ACTIVITY_FLUSH_INTERVAL_SECONDS, ACTIVITY_LAST_SEEN_RESOLUTION_SECONDS
+
+logger = logging.getLogger("auth.activity")
+
+
+class ActivityTracker:
+    # Write-behind buffer for last_login_at / last_seen_at. Only the latest
+    # timestamp per user is kept, and the whole buffer is flushed with a single
+    # bulk_write, so hot paths never wait on a Mongo write.
+    # last_seen_at is rounded down to last_seen_resolution seconds, so repeat
+    # requests within one window (e.g. an admin polling /auth/users) do not
+    # change the stored value or the listing's ETag.
+    def __init__(
+        self,
+        flush_interval: float = ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        last_seen_resolution: int = ACTIVITY_LAST_SEEN_RESOLUTION_SECONDS
+    ):
+        self.flush_interval = flush_interval
+        self.last_seen_resolution = last_seen_resolution
+        self._pending = {}
+        self._task = None
+
+    def record_login(self, user_id: str, at: datetime = None):
+        at = at or datetime.now(timezone.utc)
+        self._record(user_id, {"last_login_at": at, "last_seen_at": at})
+
+    def record_seen(self, user_id: str, at: datetime = None):
+        self._record(user_id, {"last_seen_at": self._coarsen(at or datetime.now(timezone.utc))})
+
+    def _coarsen(self, at: datetime):
+        if self.last_seen_resolution <= 0:
+            return at
+        seconds = at.timestamp()
+        return datetime.fromtimestamp(seconds - seconds % self.last_seen_resolution, timezone.utc)
+
+    def _record(self, user_id: str, fields: dict):
+        entry = self._pending.setdefault(user_id, {})
+        for field, at in fields.items():
+            if field not in entry or entry[field] < at:
+                entry[field] = at
+
+    def pending_count(self):
+        return len(self._pending)
+
+    async def flush(self):
+        if not self._pending or mongo_connection.users_collection is None:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        # $max keeps the stored value monotonic if several workers flush
+        # out of order for the same user.
+        operations = [
+            UpdateOne({"_id": ObjectId(user_id)}, {"$max": fields})
+            for user_id, fields in pending.items()
+        ]
+        try:
+            result = await mongo_connection.users_collection.bulk_write(operations, ordered=False)
+        except Exception:
+            # Put the entries back so the next flush retries them, without
+            # overwriting anything newer recorded in the meantime.
+            for user_id, fields in pending.items():
+                self._record(user_id, fields)
+            raise
+        # last_*_at are part of the user listing, so its ETag must change,
+        # but only if $max actually moved a stored value
+        if result.modified_count:
+            await mongo_connection.bump_collection_version("users")
+        return len(operations)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Activity flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Activity flush failed")
+
+
+activity_tracker = ActivityTracker()
@@ -0,0 +1,97 @@
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from utils.settings import (
+    CPU_ADMISSION_MAX_CONCURRENCY,
+    CPU_ADMISSION_MAX_QUEUE,
+    CPU_ADMISSION_QUEUE_TIMEOUT_SECONDS,
+)
+
+
+class AdmissionController:
+    # Caps how many expensive requests run at once. Up to max_queue more may
+    # wait for a slot for at most queue_timeout seconds. Anything beyond that
+    # is shed straight away with a 503 instead of piling up on the worker.
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted_total = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self):
+        # asyncio primitives are bound to one loop; rebuild after a loop change
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.in_flight = 0
+            self.queued = 0
+        return self._semaphore
+
+    def _shed(self):
+        retry_after = max(1, round(self.queue_timeout))
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    @asynccontextmanager
+    async def slot(self):
+        semaphore = self._get_semaphore()
+        if semaphore.locked() and self.queued >= self.max_queue:
+            self.shed_queue_full += 1
+            raise self._shed()
+
+        self.queued += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.shed_timeout += 1
+            raise self._shed()
+        finally:
+            self.queued -= 1
+
+        self.in_flight += 1
+        self.admitted_total += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def run(self, handler):
+        # For work that may not run at all (e.g. idempotent replays): the
+        # slot is only taken once the handler is actually called
+        async with self.slot():
+            return await handler()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "admitted_total": self.admitted_total,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout
+        }
+
+
+cpu_admission = AdmissionController(
+    max_concurrency=CPU_ADMISSION_MAX_CONCURRENCY,
+    max_queue=CPU_ADMISSION_MAX_QUEUE,
+    queue_timeout=CPU_ADMISSION_QUEUE_TIMEOUT_SECONDS
+)
+
+# Route dependency for the bcrypt-heavy endpoints
+async def admit_cpu_heavy():
+    async with cpu_admission.slot():
+        yield
@@ -1,9 +1,12 @@
 import bcrypt
+from utils.request_context import timed
 
 def hash_password(password: str) -> str:
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    with timed("bcrypt_ms"):
+        salt = bcrypt.gensalt()
+        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
 def verify_password(plain,hashed):
-    return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
\ No newline at end of file
+    with timed("bcrypt_ms"):
+        return bcrypt.checkpw(plain.encode('utf-8'), hashed.encode('utf-8'))
\ No newline at end of file
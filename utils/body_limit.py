@@ -0,0 +1,60 @@
+import re
+from fastapi import HTTPException, status
+from utils.exception_handlers import format_error_response
+
+BODY_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def _too_large(limit):
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Request body too large. Limit is {limit} bytes"
+    )
+
+
+class BodySizeLimitMiddleware:
+    # Rejects oversized bodies before anything buffers or parses them. A
+    # declared Content-Length over the limit is refused outright. Otherwise
+    # the received chunks are counted and reading stops once the limit is
+    # passed, which also covers chunked uploads.
+    def __init__(self, app, default_limit: int, route_limits=None):
+        self.app = app
+        self.default_limit = default_limit
+        self.route_limits = [(re.compile(pattern), limit) for pattern, limit in (route_limits or [])]
+
+    def limit_for(self, path: str) -> int:
+        for pattern, limit in self.route_limits:
+            if pattern.match(path):
+                return limit
+        return self.default_limit
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in BODY_METHODS:
+            return await self.app(scope, receive, send)
+
+        limit = self.limit_for(scope["path"])
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > limit:
+                    exc = _too_large(limit)
+                    response = format_error_response(exc.detail, status_code=exc.status_code)
+                    return await response(scope, receive, send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI lets HTTPException escape body parsing, so this
+                    # goes through the normal error handler
+                    raise _too_large(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
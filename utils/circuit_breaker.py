@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+import pymongo
+from fastapi import HTTPException, status
+from pymongo.errors import ConnectionFailure, ExecutionTimeout
+from utils.settings import (
+    MONGO_BREAKER_FAILURE_THRESHOLD,
+    MONGO_BREAKER_RESET_SECONDS,
+    MONGO_BREAKER_HALF_OPEN_MAX_CALLS,
+    MONGO_OPERATION_TIMEOUT_MS,
+)
+
+logger = logging.getLogger("auth.circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_outage_error(exc: Exception) -> bool:
+    # Only "the database is unreachable or too slow" trips the breaker;
+    # ordinary errors such as duplicate keys mean the server is answering.
+    return (
+        isinstance(exc, (asyncio.TimeoutError, ConnectionFailure, ExecutionTimeout))
+        or getattr(exc, "timeout", False) is True
+    )
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+        self.rejected_total = 0
+
+    def _unavailable(self):
+        retry_after = max(1, round(self.reset_timeout - (time.monotonic() - self.opened_at)))
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database temporarily unavailable. Please try again later.",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def _before_call(self):
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected_total += 1
+                raise self._unavailable()
+            self.state = HALF_OPEN
+            self.half_open_calls = 0
+            logger.info("Circuit half-open", extra={"breaker": self.name})
+        if self.state == HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                self.rejected_total += 1
+                raise self._unavailable()
+            self.half_open_calls += 1
+
+    def _on_success(self):
+        if self.state != CLOSED:
+            logger.info("Circuit closed", extra={"breaker": self.name})
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.half_open_calls = 0
+
+    def _on_failure(self, exc):
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning("Circuit opened", extra={"breaker": self.name, "error": repr(exc)})
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def is_open(self):
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    async def call(self, operation, timeout_ms: int = MONGO_OPERATION_TIMEOUT_MS):
+        # `operation` is a zero-argument callable returning an awaitable, so
+        # nothing is sent to the database while the circuit is open.
+        self._before_call()
+        timeout = timeout_ms / 1000
+        try:
+            # pymongo.timeout also bounds the driver thread, not just our await
+            with pymongo.timeout(timeout):
+                result = await asyncio.wait_for(operation(), timeout)
+        except Exception as exc:
+            if is_outage_error(exc):
+                self._on_failure(exc)
+                raise self._unavailable() from exc
+            self._on_success()
+            raise
+        except BaseException:
+            # Cancelled mid-call: no verdict on the database, but a half-open
+            # probe must hand its slot back or every later call is rejected
+            if self.state == HALF_OPEN and self.half_open_calls > 0:
+                self.half_open_calls -= 1
+            raise
+        self._on_success()
+        return result
+
+    def stats(self):
+        return {
+            "state": OPEN if self.is_open() else (HALF_OPEN if self.state != CLOSED else CLOSED),
+            "consecutive_failures": self.consecutive_failures,
+            "rejected_total": self.rejected_total
+        }
+
+
+mongo_breaker = CircuitBreaker(
+    "mongo",
+    failure_threshold=MONGO_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=MONGO_BREAKER_RESET_SECONDS,
+    half_open_max_calls=MONGO_BREAKER_HALF_OPEN_MAX_CALLS
+)
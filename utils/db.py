@@ -1,28 +1,144 @@
+import asyncio
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
-from utils.settings import MONGO_URI
+from bson import ObjectId
+from pymongo import ASCENDING, ReadPreference, UpdateOne
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+from utils.settings import (
+    MONGO_URI, MONGO_BACKEND, MONGO_REPORTING_READ_PREFERENCE, MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    IDEMPOTENCY_TTL_SECONDS,
+)
+from utils.request_context import MongoTimingListener
+from utils.query_monitor import query_monitor
+
+logger = logging.getLogger("auth.db")
+
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+def create_client(uri=MONGO_URI, backend=MONGO_BACKEND, event_listeners=None):
+    if backend == "memory":
+        from utils.memory_db import InMemoryClient
+        return InMemoryClient()
+    if backend == "motor":
+        # Fail server selection fast instead of the driver's 30s default
+        return AsyncIOMotorClient(
+            uri,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=event_listeners or []
+        )
+    raise ValueError(f"Unknown MongoDB backend: {backend}")
+
+def read_preference_from_name(name: str):
+    try:
+        return READ_PREFERENCES[name]
+    except KeyError:
+        raise ValueError(f"Unknown read preference: {name}") from None
 
 
 class MongoDBConnection:
-    def __init__(self):
+    def __init__(self, backend=MONGO_BACKEND):
+        self.backend = backend
         self.client = None
         self.db = None
         self.users_collection = None
+        self.users_reporting_collection = None
+        self.versions_collection = None
+        self.idempotency_collection = None
 
-    async def connect(self,db_name):
+    async def connect(self,db_name,uri=MONGO_URI):
+        # The driver connects lazily, so the handles are built even while the
+        # server is down; mongo_breaker then answers with 503 and probes for
+        # recovery instead of requests failing on missing handles.
+        self.client = create_client(
+            uri, self.backend, event_listeners=[MongoTimingListener(), query_monitor]
+        )
+        query_monitor.attach(self.client, asyncio.get_running_loop())
+        self.db = self.client[db_name]
+        # Auth reads and all writes stay on the primary; admin listing,
+        # search and stats may be served by secondaries.
+        self.users_collection = self.db["users"]
+        self.users_reporting_collection = self.users_collection.with_options(
+            read_preference=read_preference_from_name(MONGO_REPORTING_READ_PREFERENCE)
+        )
+        self.versions_collection = self.db["collection_versions"]
+        self.idempotency_collection = self.db["idempotency_keys"]
         try:
-            self.client = AsyncIOMotorClient(MONGO_URI)
             await self.client.admin.command('ping')
-            self.db = self.client[db_name]
-            self.users_collection = self.db["users"]
-            print("✅ MongoDB connected")
+            await self.ensure_indexes()
+            logger.info("MongoDB connected", extra={"db_name": db_name, "backend": self.backend})
             return True
-        except Exception as e:
-            print(f"❌ MongoDB connection failed: {e}")
+        except Exception:
+            logger.exception("MongoDB connection failed")
             return False
 
+    async def ensure_indexes(self):
+        # Lowercased copies of email / full_name back the admin prefix search;
+        # role is the second key so role filters are resolved from the index.
+        await self.users_collection.create_index(
+            [("email_lower", ASCENDING), ("role", ASCENDING)], name="email_lower_role"
+        )
+        await self.users_collection.create_index(
+            [("full_name_lower", ASCENDING), ("role", ASCENDING)], name="full_name_lower_role"
+        )
+        await self.backfill_search_fields()
+        # Stored idempotent responses expire on their own
+        await self.idempotency_collection.create_index(
+            "created_at", name="created_at_ttl", expireAfterSeconds=IDEMPOTENCY_TTL_SECONDS
+        )
+
+    async def backfill_search_fields(self):
+        operations = []
+        missing = {"$or": [{"email_lower": {"$exists": False}}, {"full_name_lower": {"$exists": False}}]}
+        async for user in self.users_collection.find(missing, {"email": 1, "full_name": 1}):
+            operations.append(UpdateOne({"_id": user["_id"]}, {"$set": {
+                "email_lower": user.get("email", "").lower(),
+                "full_name_lower": user.get("full_name", "").lower()
+            }}))
+        if operations:
+            await self.users_collection.bulk_write(operations, ordered=False)
+
+    # Collection-level change counters used for list ETags. The epoch changes
+    # whenever the counter document is recreated, so versions never repeat.
+    async def bump_collection_version(self, name, session=None):
+        versions = self.causal(self.versions_collection) if session else self.versions_collection
+        await versions.update_one(
+            {"_id": name},
+            {"$inc": {"version": 1}, "$setOnInsert": {"epoch": str(ObjectId())}},
+            upsert=True,
+            session=session
+        )
+
+    async def get_collection_version(self, name, session=None):
+        versions = self.causal(self.versions_collection) if session else self.versions_collection
+        doc = await versions.find_one({"_id": name}, session=session)
+        if doc is None:
+            await self.bump_collection_version(name, session=session)
+            doc = await versions.find_one({"_id": name}, session=session)
+        return f'{doc["epoch"]}.{doc["version"]}'
+
+    async def start_causal_session(self):
+        # Reads in this session observe its earlier writes, even when they are
+        # routed to a secondary. Operations in it must go through causal().
+        return await self.client.start_session(causal_consistency=True)
+
+    def causal(self, collection):
+        # MongoDB only guarantees causal consistency (including across a
+        # failover) for majority reads and majority-acknowledged writes
+        return collection.with_options(
+            read_concern=ReadConcern("majority"), write_concern=WriteConcern("majority")
+        )
+
     async def close(self):
         if self.client:
             self.client.close()
-            print("MongoDB connection closed")
+            logger.info("MongoDB connection closed")
 
-mongo_connection = MongoDBConnection()
\ No newline at end of file
+mongo_connection = MongoDBConnection()
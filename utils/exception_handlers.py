@@ -1,15 +1,18 @@
+import logging
 from fastapi import  Request, HTTPException
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from typing import Optional
 from slowapi.errors import RateLimitExceeded
 
+logger = logging.getLogger("auth.errors")
+
 # ----------------- Error Formatter ----------------- #
-def format_error_response(message: str, errors: Optional[list] = None, status_code: int = 400):
+def format_error_response(message: str, errors: Optional[list] = None, status_code: int = 400, headers: Optional[dict] = None):
     content = {"success": False, "message": message}
     if errors:
         content["errors"] = errors
-    return JSONResponse(status_code=status_code, content=content)
+    return JSONResponse(status_code=status_code, content=content, headers=headers)
 
 async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
         return format_error_response("Too many requests. Please try again later.", status_code=429)
@@ -27,7 +30,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 
 async def http_exception_handler(request: Request, exc: HTTPException):
-        return format_error_response(str(exc.detail), status_code=exc.status_code)
+        return format_error_response(str(exc.detail), status_code=exc.status_code, headers=exc.headers)
 
 
 async def key_error_handler(request: Request, exc: KeyError):
@@ -38,6 +41,13 @@ async def key_error_handler(request: Request, exc: KeyError):
 
 
 async def general_exception_handler(request: Request, exc: Exception):
+        # Runs outside the request-context middleware, so pass the ID explicitly
+        request_id = getattr(request.state, "request_id", None)
+        logger.error("Unhandled exception", exc_info=exc, extra={
+            "request_id": request_id,
+            "method": request.method,
+            "path": request.url.path
+        })
         return format_error_response("Internal server error", [{
             "message": str(exc)
-        }], status_code=500)
\ No newline at end of file
+        }], status_code=500, headers={"X-Request-ID": request_id} if request_id else None)
\ No newline at end of file
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from utils.circuit_breaker import mongo_breaker
+from utils.db import mongo_connection
+from utils.ttl_cache import TTLCache
+from utils.settings import (
+    SECRET_KEY,
+    IDEMPOTENCY_TTL_SECONDS,
+    IDEMPOTENCY_LOCK_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+    IDEMPOTENCY_CACHE_SIZE,
+)
+
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = "Idempotent-Replayed"
+_POLL_INTERVAL = 0.1
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+def _digest(value: str) -> str:
+    # Keyed, because request bodies carry plaintext passwords: a bare hash
+    # in the collection could be brute-forced offline, bypassing bcrypt
+    return hmac.new(SECRET_KEY.encode("utf-8"), value.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class IdempotencyStore:
+    # Remembers the first response for each (scope, Idempotency-Key) pair.
+    # Completed responses live in a TTL-indexed collection, fronted by a
+    # small in-process cache. A pending document claims the key while the
+    # handler runs. Duplicates in this process wait on a future; duplicates
+    # in other workers poll the pending document until it completes.
+    def __init__(self, ttl_seconds: float, lock_seconds: float, wait_seconds: float, cache_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self._cache = TTLCache(max_size=cache_size, ttl=ttl_seconds)
+        self._in_flight = {}
+
+    async def run(self, key, scope: str, fingerprint: str, handler):
+        if key is None:
+            return await handler()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters"
+            )
+
+        storage_key = _digest(f"{scope}\n{key}")
+        fingerprint = _digest(fingerprint)
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            record = self._cache.get(storage_key)
+            if record is not None:
+                return self._replay(record, fingerprint)
+
+            waiter = self._in_flight.get(storage_key)
+            if waiter is not None:
+                # Same process: share the in-flight result instead of polling
+                await self._wait(asyncio.shield(waiter), deadline)
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            self._in_flight[storage_key] = future
+            try:
+                doc = await self._claim(storage_key, fingerprint)
+                if doc is None:
+                    return await self._execute(storage_key, fingerprint, handler)
+                if doc["state"] == "completed":
+                    self._cache.put(storage_key, doc["response"])
+                    return self._replay(doc["response"], fingerprint)
+                self._check_fingerprint(doc["fingerprint"], fingerprint)
+            finally:
+                self._in_flight.pop(storage_key, None)
+                if not future.done():
+                    future.set_result(None)
+
+            # Another worker holds the key; give it time to finish
+            await self._wait(asyncio.sleep(_POLL_INTERVAL), deadline)
+
+    async def _wait(self, awaitable, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if asyncio.isfuture(awaitable):
+                awaitable.cancel()
+            else:
+                awaitable.close()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still in progress"
+            )
+        try:
+            await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _claim(self, storage_key, fingerprint):
+        # Returns None if this call now owns the key, else the existing document
+        collection = mongo_connection.idempotency_collection
+        now = _utcnow()
+        claim = {
+            "fingerprint": fingerprint,
+            "state": "pending",
+            "locked_until": now + timedelta(seconds=self.lock_seconds),
+            "created_at": now,
+        }
+        try:
+            await mongo_breaker.call(lambda: collection.insert_one({"_id": storage_key, **claim}))
+            return None
+        except DuplicateKeyError:
+            pass
+
+        # Take over a pending claim whose owner died without finishing
+        taken = await mongo_breaker.call(lambda: collection.find_one_and_update(
+            {"_id": storage_key, "state": "pending", "locked_until": {"$lt": now}},
+            {"$set": claim},
+            return_document=ReturnDocument.AFTER
+        ))
+        if taken is not None:
+            return None
+        doc = await mongo_breaker.call(lambda: collection.find_one({"_id": storage_key}))
+        # Expired between the insert and the lookup: simply claim again
+        return doc if doc is not None else await self._claim(storage_key, fingerprint)
+
+    async def _execute(self, storage_key, fingerprint, handler):
+        collection = mongo_connection.idempotency_collection
+        try:
+            result = await handler()
+            record = {"status_code": 200, "body": jsonable_encoder(result)}
+        except HTTPException as exc:
+            # Client errors are part of the outcome and replay as-is; anything
+            # else (5xx, outages) releases the key so a retry runs again.
+            if exc.status_code >= 500:
+                await self._release(storage_key)
+                raise
+            record = {"status_code": exc.status_code, "detail": exc.detail}
+            await self._complete(collection, storage_key, fingerprint, record)
+            raise
+        except BaseException:
+            await self._release(storage_key)
+            raise
+        await self._complete(collection, storage_key, fingerprint, record)
+        return result
+
+    async def _complete(self, collection, storage_key, fingerprint, record):
+        record = {**record, "fingerprint": fingerprint}
+        await mongo_breaker.call(lambda: collection.update_one(
+            {"_id": storage_key},
+            {"$set": {"state": "completed", "response": record, "created_at": _utcnow()}}
+        ))
+        self._cache.put(storage_key, record)
+
+    async def _release(self, storage_key):
+        try:
+            await mongo_connection.idempotency_collection.delete_one({"_id": storage_key, "state": "pending"})
+        except Exception:
+            pass
+
+    def _check_fingerprint(self, stored, fingerprint):
+        if stored != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+
+    def _replay(self, record, fingerprint):
+        self._check_fingerprint(record["fingerprint"], fingerprint)
+        headers = {REPLAYED_HEADER: "true"}
+        if "body" in record:
+            return JSONResponse(status_code=record["status_code"], content=record["body"], headers=headers)
+        raise HTTPException(status_code=record["status_code"], detail=record["detail"], headers=headers)
+
+    def clear_cache(self):
+        self._cache.clear()
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS,
+    lock_seconds=IDEMPOTENCY_LOCK_SECONDS,
+    wait_seconds=IDEMPOTENCY_WAIT_SECONDS,
+    cache_size=IDEMPOTENCY_CACHE_SIZE
+)
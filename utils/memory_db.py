@@ -0,0 +1,557 @@
+import copy
+import re
+import bson
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.read_preferences import ReadPreference
+from pymongo.results import BulkWriteResult, DeleteResult, InsertOneResult, UpdateResult
+
+# In-memory stand-in for the subset of the Motor API used by this project:
+# only the operators, stages and methods the controllers and tests call.
+# Anything else fails loudly instead of guessing at semantics.
+# All clients in a process share one "server", so separate clients see the
+# same data, just like separate connections to a real mongod would.
+_server = {}
+
+_MISSING = object()
+
+
+# ----------------- Values ----------------- #
+def _roundtrip(value):
+    # Store and compare exactly what a real server would (naive UTC datetimes,
+    # lists instead of tuples, plain str for str enums...).
+    return bson.decode(bson.encode({"v": value}))["v"]
+
+def _type_rank(value):
+    if value is None or value is _MISSING:
+        return 1
+    if isinstance(value, bool):
+        return 8
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, bytes):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 9
+    return 10
+
+def _sort_key(value):
+    rank = _type_rank(value)
+    if rank == 1:
+        return (rank, 0)
+    if rank in (4, 5, 10):
+        return (rank, repr(value))
+    return (rank, value)
+
+def _compare(a, b):
+    if _type_rank(a) != _type_rank(b):
+        return None
+    key_a, key_b = _sort_key(a), _sort_key(b)
+    return (key_a > key_b) - (key_a < key_b)
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _get_path(doc, path):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+
+# ----------------- Query Matching ----------------- #
+def _values_equal(stored, expected):
+    if expected is None:
+        return stored is _MISSING or stored is None
+    if stored == expected and _type_rank(stored) == _type_rank(expected):
+        return True
+    return isinstance(stored, list) and any(_values_equal(item, expected) for item in stored)
+
+def _match_operator(stored, operator, operand):
+    if operator == "$ne":
+        return not _values_equal(stored, operand)
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        candidates = stored if isinstance(stored, list) else [stored]
+        for candidate in candidates:
+            result = _compare(candidate, operand)
+            if result is None or candidate is _MISSING:
+                continue
+            if {"$gt": result > 0, "$gte": result >= 0, "$lt": result < 0, "$lte": result <= 0}[operator]:
+                return True
+        return False
+    if operator == "$in":
+        return any(_values_equal(stored, value) for value in operand)
+    if operator == "$exists":
+        return (stored is not _MISSING) == bool(operand)
+    if operator == "$regex":
+        regex = re.compile(operand)
+        candidates = stored if isinstance(stored, list) else [stored]
+        return any(isinstance(c, str) and regex.search(c) for c in candidates)
+    raise OperationFailure(f"unknown operator: {operator}")
+
+def _is_operator_dict(value):
+    return isinstance(value, dict) and value and all(k.startswith("$") for k in value)
+
+def _match_condition(stored, condition):
+    if _is_operator_dict(condition):
+        return all(_match_operator(stored, op, operand) for op, operand in condition.items())
+    return _values_equal(stored, condition)
+
+def _matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(_matches(doc, clause) for clause in condition):
+                return False
+        elif key.startswith("$"):
+            raise OperationFailure(f"unknown top level operator: {key}")
+        elif not _match_condition(_get_path(doc, key), condition):
+            return False
+    return True
+
+
+# ----------------- Updates ----------------- #
+def _apply_update(doc, update, inserting=False):
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        for path, value in fields.items():
+            current = _get_path(doc, path)
+            if operator in ("$set", "$setOnInsert"):
+                _set_path(doc, path, copy.deepcopy(value))
+            elif operator == "$inc":
+                _set_path(doc, path, value if current is _MISSING else current + value)
+            elif operator == "$max":
+                result = None if current is _MISSING else _compare(value, current)
+                if current is _MISSING or (result is not None and result > 0):
+                    _set_path(doc, path, value)
+            else:
+                raise OperationFailure(f"Unknown modifier: {operator}")
+
+def _upsert_seed(query):
+    doc = {}
+    for key, condition in query.items():
+        if not key.startswith("$") and not _is_operator_dict(condition):
+            _set_path(doc, key, copy.deepcopy(condition))
+    return doc
+
+def _project(doc, projection):
+    # Inclusion projections only, which is all the project uses
+    if not projection:
+        return copy.deepcopy(doc)
+    include_id = projection.get("_id", 1)
+    result = {}
+    for path, include in projection.items():
+        if path == "_id":
+            continue
+        if not include:
+            raise OperationFailure("exclusion projections are not supported")
+        value = _get_path(doc, path)
+        if value is not _MISSING:
+            _set_path(result, path, copy.deepcopy(value))
+    if include_id and "_id" in doc:
+        result["_id"] = doc["_id"]
+    elif not include_id:
+        result.pop("_id", None)
+    return result
+
+def _sort_docs(docs, sort):
+    for field, direction in reversed(sort):
+        docs.sort(key=lambda d: _sort_key(_get_path(d, field)), reverse=direction < 0)
+    return docs
+
+
+# ----------------- Aggregation ----------------- #
+def _date_to_string(date, fmt):
+    if date is None or date is _MISSING:
+        return None
+    return date.strftime(fmt.replace("%L", f"{date.microsecond // 1000:03d}"))
+
+def _eval(expr, doc):
+    if isinstance(expr, str) and expr.startswith("$"):
+        value = _get_path(doc, expr[1:])
+        return None if value is _MISSING else value
+    if isinstance(expr, list):
+        return [_eval(item, doc) for item in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1 and next(iter(expr)).startswith("$"):
+        operator, operand = next(iter(expr.items()))
+        if operator == "$toDate":
+            value = _eval(operand, doc)
+            if isinstance(value, ObjectId):
+                return value.generation_time.replace(tzinfo=None)
+            return value
+        if operator == "$dateToString":
+            return _date_to_string(_eval(operand["date"], doc), operand.get("format", "%Y-%m-%dT%H:%M:%S.%LZ"))
+        raise OperationFailure(f"Unrecognized expression '{operator}'")
+    return {key: _eval(value, doc) for key, value in expr.items()}
+
+def _accumulate(operator, values):
+    if operator == "$sum":
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    raise OperationFailure(f"unknown group operator '{operator}'")
+
+def _run_pipeline(docs, pipeline):
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            docs = [d for d in docs if _matches(d, spec)]
+        elif name == "$group":
+            groups = {}
+            for doc in docs:
+                key = _eval(spec["_id"], doc)
+                groups.setdefault(_freeze(key), (key, []))[1].append(doc)
+            results = []
+            for key, members in groups.values():
+                row = {"_id": key}
+                for field, accumulator in spec.items():
+                    if field != "_id":
+                        (operator, expr), = accumulator.items()
+                        row[field] = _accumulate(operator, [_eval(expr, d) for d in members])
+                results.append(row)
+            docs = results
+        elif name == "$sort":
+            docs = _sort_docs(list(docs), list(spec.items()))
+        else:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'")
+    return docs
+
+
+# ----------------- Cursor ----------------- #
+class InMemoryCursor:
+    def __init__(self, collection, query=None, projection=None, results=None):
+        self._collection = collection
+        self._query = query or {}
+        self._projection = projection
+        self._results = results
+        self._sort = []
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=1):
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list.items() if isinstance(key_or_list, dict) else key_or_list)
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def _materialize(self):
+        if self._results is not None:
+            return copy.deepcopy(self._results)
+        docs = self._collection._select(self._query)
+        if self._sort:
+            docs = _sort_docs(docs, self._sort)
+        if self._limit:
+            docs = docs[:self._limit]
+        return [_project(doc, self._projection) for doc in docs]
+
+    async def to_list(self, length=None):
+        docs = self._materialize()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._materialize():
+            yield doc
+
+    async def explain(self):
+        return {"queryPlanner": {
+            "namespace": self._collection.full_name,
+            "winningPlan": self._collection._plan(self._query)
+        }}
+
+
+# ----------------- Collection ----------------- #
+class _CollectionState:
+    def __init__(self):
+        self.docs = {}
+        self.indexes = {"_id_": {"key": [("_id", 1)], "unique": True}}
+
+
+class InMemoryCollection:
+    def __init__(self, database, name, read_preference=ReadPreference.PRIMARY):
+        self.database = database
+        self.name = name
+        self.full_name = f"{database.name}.{name}"
+        self.read_preference = read_preference
+
+    def with_options(self, read_preference=None, **kwargs):
+        return InMemoryCollection(self.database, self.name, read_preference or self.read_preference)
+
+    def _state(self, create=False):
+        collections = self.database._collections(create)
+        if collections is None:
+            return None
+        if create:
+            return collections.setdefault(self.name, _CollectionState())
+        return collections.get(self.name)
+
+    def _purge_expired(self, state):
+        for spec in state.indexes.values():
+            ttl = spec.get("expireAfterSeconds")
+            if ttl is None:
+                continue
+            field = spec["key"][0][0]
+            cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=ttl)
+            for _id, doc in list(state.docs.items()):
+                value = doc.get(field)
+                if isinstance(value, datetime) and value < cutoff:
+                    del state.docs[_id]
+
+    def _select(self, query):
+        state = self._state()
+        if state is None:
+            return []
+        self._purge_expired(state)
+        query = _roundtrip(query or {})
+        return [doc for doc in state.docs.values() if _matches(doc, query)]
+
+    def _check_unique(self, state, doc):
+        for name, spec in state.indexes.items():
+            if not spec.get("unique") or name == "_id_":
+                continue
+            key = tuple(_freeze(_get_path(doc, field)) for field, _ in spec["key"])
+            for other in state.docs.values():
+                if other["_id"] != doc["_id"] and tuple(
+                    _freeze(_get_path(other, field)) for field, _ in spec["key"]
+                ) == key:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.full_name} index: {name}",
+                        11000
+                    )
+
+    def _insert(self, state, doc):
+        if doc["_id"] in state.docs:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} index: _id_", 11000
+            )
+        self._check_unique(state, doc)
+        state.docs[doc["_id"]] = doc
+
+    def _update(self, query, update, upsert=False):
+        state = self._state(create=True)
+        self._purge_expired(state)
+        query, update = _roundtrip(query), _roundtrip(update)
+        matched = [d for d in state.docs.values() if _matches(d, query)][:1]
+        modified = 0
+        for doc in matched:
+            updated = copy.deepcopy(doc)
+            _apply_update(updated, update)
+            if updated != doc:
+                self._check_unique(state, updated)
+                state.docs[doc["_id"]] = updated
+                modified += 1
+        raw = {"n": len(matched), "nModified": modified, "ok": 1.0}
+        if not matched and upsert:
+            doc = _upsert_seed(query)
+            doc.setdefault("_id", ObjectId())
+            _apply_update(doc, update, inserting=True)
+            self._insert(state, doc)
+            raw.update(n=1, upserted=doc["_id"])
+        return raw
+
+    def _delete(self, query):
+        state = self._state()
+        if state is None:
+            return 0
+        matched = [_id for _id, d in state.docs.items() if _matches(d, _roundtrip(query))]
+        for _id in matched[:1]:
+            del state.docs[_id]
+        return len(matched[:1])
+
+    def _plan(self, query):
+        # Rough stand-in for explain(): any query field that leads an index
+        # counts as an IXSCAN. It says nothing about whether a real server
+        # would use that index, so plan assertions belong to Motor runs.
+        state = self._state()
+        indexes = state.indexes if state else {}
+        if "$or" in query:
+            branches = [self._plan(clause) for clause in query["$or"]]
+            if all(branch["stage"] != "COLLSCAN" for branch in branches):
+                return {"stage": "SUBPLAN", "inputStage": {"stage": "OR", "inputStages": branches}}
+            return {"stage": "COLLSCAN", "filter": query}
+        fields = {key for key in query if not key.startswith("$")}
+        for name, spec in indexes.items():
+            if spec["key"][0][0] in fields:
+                return {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": name}}
+        return {"stage": "COLLSCAN", "filter": query}
+
+    async def find_one(self, filter=None, projection=None, *args, session=None, **kwargs):
+        docs = self._select(filter)
+        return _project(docs[0], projection) if docs else None
+
+    def find(self, filter=None, projection=None, *args, session=None, **kwargs):
+        return InMemoryCursor(self, filter, projection)
+
+    async def insert_one(self, document, session=None, **kwargs):
+        document.setdefault("_id", ObjectId())
+        state = self._state(create=True)
+        self._purge_expired(state)
+        self._insert(state, _roundtrip(document))
+        return InsertOneResult(document["_id"], True)
+
+    async def update_one(self, filter, update, upsert=False, session=None, **kwargs):
+        raw = self._update(filter, update, upsert=upsert)
+        return UpdateResult(raw, True)
+
+    async def find_one_and_update(
+        self, filter, update, projection=None, upsert=False,
+        return_document=False, session=None, **kwargs
+    ):
+        docs = self._select(filter)
+        before = copy.deepcopy(docs[0]) if docs else None
+        query = {"_id": before["_id"]} if before else filter
+        raw = self._update(query, update, upsert=upsert)
+        if return_document:
+            _id = before["_id"] if before else raw.get("upserted")
+            return await self.find_one({"_id": _id}, projection) if _id is not None else None
+        return _project(before, projection) if before else None
+
+    async def delete_one(self, filter, session=None, **kwargs):
+        return DeleteResult({"n": self._delete(filter), "ok": 1.0}, True)
+
+    async def bulk_write(self, requests, ordered=True, session=None, **kwargs):
+        result = {
+            "writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+            "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []
+        }
+        for index, request in enumerate(requests):
+            try:
+                if not isinstance(request, UpdateOne):
+                    raise TypeError(f"{request!r} is not a supported request")
+                raw = self._update(request._filter, request._doc, upsert=bool(request._upsert))
+                if "upserted" in raw:
+                    result["nUpserted"] += 1
+                    result["upserted"].append({"index": index, "_id": raw["upserted"]})
+                else:
+                    result["nMatched"] += raw["n"]
+                    result["nModified"] += raw["nModified"]
+            except DuplicateKeyError as e:
+                result["writeErrors"].append({"index": index, "code": 11000, "errmsg": str(e), "op": request})
+                if ordered:
+                    break
+        if result["writeErrors"]:
+            raise BulkWriteError(result)
+        return BulkWriteResult(result, True)
+
+    def aggregate(self, pipeline, session=None, **kwargs):
+        return InMemoryCursor(self, results=_run_pipeline(self._select({}), pipeline))
+
+    async def count_documents(self, filter, session=None, **kwargs):
+        return len(self._select(filter))
+
+    async def estimated_document_count(self, **kwargs):
+        return len(self._select({}))
+
+    async def create_index(self, keys, name=None, unique=False, expireAfterSeconds=None, session=None, **kwargs):
+        keys = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        state = self._state(create=True)
+        spec = {"key": keys, "unique": unique}
+        if expireAfterSeconds is not None:
+            spec["expireAfterSeconds"] = expireAfterSeconds
+        if unique:
+            seen = set()
+            for doc in state.docs.values():
+                key = tuple(_freeze(_get_path(doc, field)) for field, _ in keys)
+                if key in seen:
+                    raise DuplicateKeyError(
+                        f"E11000 duplicate key error collection: {self.full_name} index: {name}", 11000
+                    )
+                seen.add(key)
+        state.indexes[name] = spec
+        return name
+
+
+
+# ----------------- Database / Client ----------------- #
+class InMemoryDatabase:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def _collections(self, create=False):
+        if create:
+            return _server.setdefault(self.name, {})
+        return _server.get(self.name)
+
+    def __getitem__(self, name):
+        return InMemoryCollection(self, name)
+
+    async def list_collection_names(self, session=None, **kwargs):
+        return list(self._collections() or {})
+
+    async def command(self, command, *args, session=None, **kwargs):
+        name = command if isinstance(command, str) else next(iter(command))
+        if name == "ping":
+            return {"ok": 1.0}
+        if name == "explain" and isinstance(command, dict):
+            explained = command["explain"]
+            collection = self[explained["find"]]
+            return {"queryPlanner": {
+                "namespace": collection.full_name,
+                "winningPlan": collection._plan(explained.get("filter") or {})
+            }, "ok": 1.0}
+        raise OperationFailure(f"no such command: '{name}'")
+
+
+class InMemorySession:
+    def __init__(self, causal_consistency=True):
+        self.causal_consistency = causal_consistency
+        self.in_transaction = False
+        self.has_ended = False
+
+    async def end_session(self):
+        self.has_ended = True
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.end_session()
+
+
+class InMemoryClient:
+    def __init__(self, *args, **kwargs):
+        self.admin = InMemoryDatabase(self, "admin")
+
+    def __getitem__(self, name):
+        return InMemoryDatabase(self, name)
+
+    async def start_session(self, causal_consistency=None, **kwargs):
+        return InMemorySession(causal_consistency is not False)
+
+    async def drop_database(self, name, session=None):
+        _server.pop(name.name if isinstance(name, InMemoryDatabase) else name, None)
+
+    def close(self):
+        pass
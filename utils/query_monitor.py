@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import random
+import threading
+from collections import deque
+from pymongo import monitoring
+from utils.request_context import current_route
+from utils.settings import (
+    SLOW_QUERY_THRESHOLD_MS,
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    SLOW_QUERY_MAX_RECENT,
+)
+
+logger = logging.getLogger("auth.slow_query")
+
+# Driver housekeeping, plus our own explain calls, are not worth tracking
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "buildInfo", "endSessions",
+    "saslStart", "saslContinue", "getMore", "killCursors", "explain",
+}
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "update", "delete", "findAndModify"}
+# Envelope fields the driver adds that an explain command does not accept
+_ENVELOPE_FIELDS = {"lsid", "txnNumber", "autocommit", "startTransaction", "readConcern", "writeConcern", "apiVersion", "apiStrict", "apiDeprecationErrors"}
+
+
+def summarize_plan(plan: dict):
+    stages, indexes = [], []
+
+    def walk(node):
+        stages.append(node.get("stage"))
+        if node.get("indexName"):
+            indexes.append(node["indexName"])
+        for child in [node.get("inputStage")] + node.get("inputStages", []):
+            if child:
+                walk(child)
+
+    winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+    walk(winning_plan.get("queryPlan", winning_plan))
+    return {
+        "stages": stages,
+        "indexes": indexes,
+        "collection_scan": "COLLSCAN" in stages
+    }
+
+def _explainable(command: dict):
+    return {k: v for k, v in command.items() if not k.startswith("$") and k not in _ENVELOPE_FIELDS}
+
+
+class SlowQueryMonitor(monitoring.CommandListener):
+    # Times every command the driver sends. Commands over the threshold are
+    # logged with the route that issued them, and a sample of them gets an
+    # explain plan captured in the background. Callbacks run on driver
+    # threads, so shared state is guarded by a lock.
+    def __init__(self, threshold_ms: float, explain_sample_rate: float, max_recent: int = 50):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._totals = {}
+        self.recent_slow = deque(maxlen=max_recent)
+        self._loop = None
+        self._client = None
+
+    def attach(self, client, loop=None):
+        # Explain plans are fetched on this client from the given event loop
+        self._client = client
+        self._loop = loop or asyncio.get_running_loop()
+
+    def reset(self):
+        with self._lock:
+            self._in_flight.clear()
+            self._totals.clear()
+            self.recent_slow.clear()
+
+    # ----------------- Listener callbacks ----------------- #
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        with self._lock:
+            self._in_flight[(event.connection_id, event.request_id)] = {
+                "command": event.command_name,
+                "collection": command.get(event.command_name) if isinstance(command.get(event.command_name), str) else None,
+                "database": event.database_name,
+                "route": current_route(),
+                "body": dict(command),
+            }
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed):
+        with self._lock:
+            info = self._in_flight.pop((event.connection_id, event.request_id), None)
+        if info is None:
+            return
+        duration_ms = event.duration_micros / 1000
+        slow = duration_ms >= self.threshold_ms
+        key = (info["command"], info["collection"], info["route"])
+        with self._lock:
+            totals = self._totals.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "slow_count": 0, "failed_count": 0})
+            totals["count"] += 1
+            totals["total_ms"] += duration_ms
+            totals["max_ms"] = max(totals["max_ms"], duration_ms)
+            totals["slow_count"] += slow
+            totals["failed_count"] += failed
+        if slow:
+            self._record_slow(info, duration_ms)
+
+    def _record_slow(self, info, duration_ms):
+        entry = {
+            "command": info["command"],
+            "collection": info["collection"],
+            "route": info["route"],
+            "duration_ms": round(duration_ms, 2),
+            "plan": None,
+        }
+        filter_doc = info["body"].get("filter")
+        logger.warning("Slow MongoDB command", extra={
+            **{k: v for k, v in entry.items() if k != "plan"},
+            "filter_fields": sorted(filter_doc) if isinstance(filter_doc, dict) else None,
+        })
+        with self._lock:
+            self.recent_slow.append(entry)
+        if (
+            info["command"] in EXPLAINABLE_COMMANDS
+            and self._loop is not None
+            and random.random() < self.explain_sample_rate
+        ):
+            command = _explainable(info["body"])
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(self._capture_explain(entry, info["database"], command))
+            )
+
+    async def _capture_explain(self, entry, database, command):
+        try:
+            plan = await self._client[database].command(
+                {"explain": command, "verbosity": "queryPlanner"}
+            )
+            entry["plan"] = summarize_plan(plan)
+            if entry["plan"]["collection_scan"]:
+                logger.warning("Slow MongoDB command uses a collection scan", extra={
+                    "command": entry["command"],
+                    "collection": entry["collection"],
+                    "route": entry["route"],
+                })
+        except Exception:
+            logger.exception("Explain capture failed")
+
+    # ----------------- Summary ----------------- #
+    def top_commands(self, limit: int = 10):
+        with self._lock:
+            rows = [
+                {
+                    "command": command,
+                    "collection": collection,
+                    "route": route,
+                    "count": totals["count"],
+                    "total_ms": round(totals["total_ms"], 2),
+                    "avg_ms": round(totals["total_ms"] / totals["count"], 2),
+                    "max_ms": round(totals["max_ms"], 2),
+                    "slow_count": totals["slow_count"],
+                    "failed_count": totals["failed_count"],
+                }
+                for (command, collection, route), totals in self._totals.items()
+            ]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows[:limit]
+
+    def summary(self, limit: int = 10):
+        with self._lock:
+            recent = list(self.recent_slow)
+        return {
+            "threshold_ms": self.threshold_ms,
+            "explain_sample_rate": self.explain_sample_rate,
+            "top_commands": self.top_commands(limit),
+            "recent_slow": recent,
+        }
+
+
+query_monitor = SlowQueryMonitor(
+    threshold_ms=SLOW_QUERY_THRESHOLD_MS,
+    explain_sample_rate=SLOW_QUERY_EXPLAIN_SAMPLE_RATE,
+    max_recent=SLOW_QUERY_MAX_RECENT
+)
@@ -0,0 +1,101 @@
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pymongo import monitoring
+
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+request_timings_var: ContextVar = ContextVar("request_timings", default=None)
+request_scope_var: ContextVar = ContextVar("request_scope", default=None)
+
+logger = logging.getLogger("auth.request")
+
+
+def current_route():
+    # Route template (e.g. "PUT /auth/users/{user_id}/profile") of the request
+    # being served; the router fills scope["route"] in after matching.
+    scope = request_scope_var.get()
+    if scope is None:
+        return None
+    route = scope.get("route")
+    return f'{scope["method"]} {getattr(route, "path", scope["path"])}'
+
+
+# ----------------- Timings ----------------- #
+def add_timing(name: str, ms: float):
+    timings = request_timings_var.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + ms
+
+@contextmanager
+def timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, (time.perf_counter() - start) * 1000)
+
+
+class MongoTimingListener(monitoring.CommandListener):
+    # Motor runs commands in executor threads with a copy of the caller's
+    # context, so the request's timings dict is reachable from here.
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        add_timing("mongo_ms", event.duration_micros / 1000)
+
+    def failed(self, event):
+        add_timing("mongo_ms", event.duration_micros / 1000)
+
+
+# ----------------- Middleware ----------------- #
+def _incoming_request_id(scope):
+    for name, value in scope.get("headers", []):
+        if name == b"x-request-id":
+            value = value.decode("latin-1").strip()
+            if 0 < len(value) <= 64 and value.isprintable():
+                return value
+    return uuid.uuid4().hex
+
+
+class RequestContextMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        request_id = _incoming_request_id(scope)
+        timings = {"bcrypt_ms": 0.0, "mongo_ms": 0.0}
+        scope.setdefault("state", {})["request_id"] = request_id
+        id_token = request_id_var.set(request_id)
+        timings_token = request_timings_var.set(timings)
+        scope_token = request_scope_var.set(scope)
+        response_status = 500
+        start = time.perf_counter()
+
+        async def send_with_request_id(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            logger.info("request completed", extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": response_status,
+                "total_ms": round((time.perf_counter() - start) * 1000, 2),
+                "bcrypt_ms": round(timings["bcrypt_ms"], 2),
+                "mongo_ms": round(timings["mongo_ms"], 2),
+            })
+            request_scope_var.reset(scope_token)
+            request_timings_var.reset(timings_token)
+            request_id_var.reset(id_token)
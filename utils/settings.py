@@ -6,6 +6,50 @@ BASE_DIR = path.dirname(path.dirname(path.realpath(__file__)))
 MONGO_URI = config('MONGO_URI')
 MONGO_DB_NAME = config('MONGO_DB_NAME')
 MONGO_TEST_DB_NAME = config('MONGO_TEST_DB_NAME')
+# "motor" talks to MONGO_URI; "memory" keeps all data in process (tests, benchmarks)
+MONGO_BACKEND = config('MONGO_BACKEND', default='motor')
+# Read preference for admin and reporting reads (listing, search, stats)
+MONGO_REPORTING_READ_PREFERENCE = config('MONGO_REPORTING_READ_PREFERENCE', default='secondaryPreferred')
 
 SECRET_KEY = config('SECRET_KEY')
 ACCESS_TOKEN_EXPIRE_MINUTES = config('ACCESS_TOKEN_EXPIRE_MINUTES',cast=int)
+
+# Upper bound (seconds) on how stale last_login_at / last_seen_at may be
+ACTIVITY_FLUSH_INTERVAL_SECONDS = config('ACTIVITY_FLUSH_INTERVAL_SECONDS', default=10, cast=float)
+ACTIVITY_LAST_SEEN_RESOLUTION_SECONDS = config('ACTIVITY_LAST_SEEN_RESOLUTION_SECONDS', default=300, cast=int)
+
+# Admin statistics endpoint
+USER_STATS_CACHE_TTL_SECONDS = config('USER_STATS_CACHE_TTL_SECONDS', default=60, cast=float)
+USER_STATS_SIGNUP_DAYS = config('USER_STATS_SIGNUP_DAYS', default=30, cast=int)
+
+# Admission control for bcrypt-heavy endpoints (signup, login, change-password)
+CPU_ADMISSION_MAX_CONCURRENCY = config('CPU_ADMISSION_MAX_CONCURRENCY', default=4, cast=int)
+CPU_ADMISSION_MAX_QUEUE = config('CPU_ADMISSION_MAX_QUEUE', default=16, cast=int)
+CPU_ADMISSION_QUEUE_TIMEOUT_SECONDS = config('CPU_ADMISSION_QUEUE_TIMEOUT_SECONDS', default=2, cast=float)
+
+# Request body size limits (bytes), enforced before the body is parsed
+MAX_REQUEST_BODY_BYTES = config('MAX_REQUEST_BODY_BYTES', default=16384, cast=int)
+MAX_AUTH_BODY_BYTES = config('MAX_AUTH_BODY_BYTES', default=2048, cast=int)
+
+# Mongo deadlines and circuit breaker
+MONGO_SERVER_SELECTION_TIMEOUT_MS = config('MONGO_SERVER_SELECTION_TIMEOUT_MS', default=2000, cast=int)
+MONGO_OPERATION_TIMEOUT_MS = config('MONGO_OPERATION_TIMEOUT_MS', default=2000, cast=int)
+MONGO_REPORTING_TIMEOUT_MS = config('MONGO_REPORTING_TIMEOUT_MS', default=10000, cast=int)
+MONGO_BREAKER_FAILURE_THRESHOLD = config('MONGO_BREAKER_FAILURE_THRESHOLD', default=5, cast=int)
+MONGO_BREAKER_RESET_SECONDS = config('MONGO_BREAKER_RESET_SECONDS', default=10, cast=float)
+MONGO_BREAKER_HALF_OPEN_MAX_CALLS = config('MONGO_BREAKER_HALF_OPEN_MAX_CALLS', default=1, cast=int)
+# Serve recently seen principals from memory while Mongo is unavailable
+MONGO_BREAKER_SERVE_CACHED_PRINCIPALS = config('MONGO_BREAKER_SERVE_CACHED_PRINCIPALS', default=False, cast=bool)
+PRINCIPAL_CACHE_TTL_SECONDS = config('PRINCIPAL_CACHE_TTL_SECONDS', default=300, cast=float)
+PRINCIPAL_CACHE_MAX_SIZE = config('PRINCIPAL_CACHE_MAX_SIZE', default=10000, cast=int)
+
+# Slow-query log: threshold, share of slow commands that get an explain plan
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=100, cast=float)
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = config('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', default=0.1, cast=float)
+SLOW_QUERY_MAX_RECENT = config('SLOW_QUERY_MAX_RECENT', default=50, cast=int)
+
+# Idempotency-Key support for signup and change-password
+IDEMPOTENCY_TTL_SECONDS = config('IDEMPOTENCY_TTL_SECONDS', default=86400, cast=int)
+IDEMPOTENCY_LOCK_SECONDS = config('IDEMPOTENCY_LOCK_SECONDS', default=30, cast=float)
+IDEMPOTENCY_WAIT_SECONDS = config('IDEMPOTENCY_WAIT_SECONDS', default=10, cast=float)
+IDEMPOTENCY_CACHE_SIZE = config('IDEMPOTENCY_CACHE_SIZE', default=1024, cast=int)
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("auth.cache")
+
+
+class RefreshingCache:
+    # Holds a single computed value. Once it is older than ttl the stale value
+    # keeps being served while one background task recomputes it, so only the
+    # very first caller ever waits on the loader.
+    def __init__(self, loader, ttl: float):
+        self.loader = loader
+        self.ttl = ttl
+        self._value = None
+        self._loaded_at = 0.0
+        self._task = None
+
+    def is_stale(self):
+        return time.monotonic() - self._loaded_at >= self.ttl
+
+    async def _refresh(self):
+        value = await self.loader()
+        self._value = value
+        self._loaded_at = time.monotonic()
+        return value
+
+    def _start_refresh(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh())
+            self._task.add_done_callback(self._log_failure)
+        return self._task
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception():
+            logger.error("Cache refresh failed", exc_info=task.exception())
+
+    async def get(self):
+        if self._value is None:
+            # Nothing to serve yet; concurrent first callers share one load
+            return await asyncio.shield(self._start_refresh())
+        if self.is_stale():
+            self._start_refresh()
+        return self._value
+
+    def invalidate(self):
+        self._value = None
+        self._loaded_at = 0.0
@@ -0,0 +1,30 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    # Small LRU of dict values that also expire after ttl seconds
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return dict(value)
+
+    def put(self, key, value: dict):
+        self._entries[key] = (time.monotonic(), dict(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()